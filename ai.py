@@ -0,0 +1,105 @@
+import random
+
+FIELD_W = 240
+FIELD_H = 135
+
+# Difficulty -> (speed factor, predicts the intercept, aim error in px).
+# Easy chases the nearest ball's current height; the others aim where
+# the most urgent ball will reach the paddle.
+LEVELS = {
+    "easy": (0.5, False, 0),
+    "medium": (0.75, True, 20),
+    "hard": (1.0, True, 0)
+}
+
+# Predictive paddles stop within this many px of their target instead of
+# twitching around it
+DEAD_BAND = 2
+
+
+def fold(y, r):
+    # Height of a ball travelling in a straight line to y, once its
+    # reflections off the top and bottom walls are folded back in
+    span = FIELD_H - 2 * r
+    u = (y - r) % (2 * span)
+    if u > span:
+        u = 2 * span - u
+    return r + u
+
+
+class AI:
+    # Steers one paddle. Predictions are cached per ball along with the
+    # velocity they were made for, so they are redone only after a wall
+    # or paddle bounce, a magnet pull or a collision changes it.
+    def __init__(self, speed_factor=0.75, predict=True, error=0):
+        self.speed_factor = speed_factor
+        self.predict = predict
+        self.error = error
+        self.ticks = 0
+        self.cache = {}  # Ball -> [vx, vy, arrival tick, intercept y]
+
+    def set_level(self, level):
+        self.speed_factor, self.predict, self.error = LEVELS[level]
+        self.cache.clear()
+
+    def intercept(self, paddle, balls):
+        # Intercept height of the ball that arrives first, or None if no
+        # ball is coming
+        if paddle.x < FIELD_W // 2:
+            face = paddle.x + paddle.width
+            toward = -1
+        else:
+            face = paddle.x
+            toward = 1
+        cache = self.cache
+        if len(cache) > len(balls):
+            cache.clear()  # Drop balls that have gone
+        now = self.ticks
+        best = None
+        best_t = 0
+        for ball in balls:
+            vx = ball.vx
+            if vx * toward <= 0 or ball.controlled:
+                continue
+            entry = cache.get(ball)
+            if entry is None:
+                entry = cache[ball] = [0, 0, 0, 0]
+            vy = ball.vy
+            if entry[0] != vx or entry[1] != vy:
+                t = (face - toward * ball.radius - ball.x) / vx
+                y = fold(ball.y + vy * t, ball.radius)
+                if self.error:
+                    y += random.randint(-self.error, self.error)
+                entry[0] = vx
+                entry[1] = vy
+                entry[2] = now + t
+                entry[3] = y
+            t = entry[2] - now
+            if t >= 0 and (best is None or t < best_t):
+                best = entry[3]
+                best_t = t
+        return best
+
+    def update(self, paddle, balls):
+        self.ticks += 1
+        if self.predict:
+            target = self.intercept(paddle, balls)
+            if target is None:
+                target = FIELD_H / 2  # Wait in the middle
+            dead_band = DEAD_BAND
+        else:
+            centre = paddle.y + paddle.height / 2
+            target_ball = balls[0]
+            for ball in balls:
+                if abs(ball.y - centre) < abs(target_ball.y - centre):
+                    target_ball = ball
+            target = target_ball.y
+            dead_band = 0
+        target_y = target - paddle.height / 2
+
+        if paddle.y < target_y - dead_band:
+            paddle.move("down")
+            paddle.velocity *= self.speed_factor
+        elif paddle.y > target_y + dead_band:
+            paddle.move("up")
+            paddle.velocity *= self.speed_factor
@@ -0,0 +1,183 @@
+from array import array
+
+FIELD_W = 240
+FIELD_H = 135
+
+# Uniform grid broadphase. Objects are binned by centre, so a cell must be
+# at least as wide as the largest pair of radii (ball 3 + power-up 5) for
+# the 3x3 neighbourhood to find every overlap.
+CELL = 32
+COLS = (FIELD_W + CELL - 1) // CELL
+ROWS = (FIELD_H + CELL - 1) // CELL
+
+
+def bounce_walls(ball):
+    # Only reflect when moving into the wall, so a ball pushed against it
+    # (by a magnet, say) does not flip every tick
+    r = ball.radius
+    if ball.y - r <= 0 and ball.vy < 0:
+        ball.vy = -ball.vy
+        return True
+    if ball.y + r >= FIELD_H and ball.vy > 0:
+        ball.vy = -ball.vy
+        return True
+    return False
+
+
+def hit_paddle(ball, x0, y0, paddle):
+    # Swept test of a ball that moved from (x0, y0) to its current
+    # position against the paddle's inner face. The leading edge is
+    # traced to the face, so balls faster than the paddle is wide cannot
+    # tunnel through it. On a hit the ball is left touching the face.
+    if ball.controlled:
+        return False
+    r = ball.radius
+    x1 = ball.x
+    if paddle.x < FIELD_W // 2:
+        face = paddle.x + paddle.width
+        if x1 >= x0 or x1 - r > face:
+            return False
+        if x0 - r >= face:
+            t = (x0 - r - face) / (x0 - x1)
+        elif x0 >= paddle.x:
+            t = 1  # Already against the face, e.g. the paddle moved onto it
+        else:
+            return False  # Behind the paddle
+        hit_x = face + r
+    else:
+        face = paddle.x
+        if x1 <= x0 or x1 + r < face:
+            return False
+        if x0 + r <= face:
+            t = (face - x0 - r) / (x1 - x0)
+        elif x0 <= paddle.x + paddle.width:
+            t = 1
+        else:
+            return False
+        hit_x = face - r
+    y = y0 + (ball.y - y0) * t
+    if not paddle.y <= y <= paddle.y + paddle.height:
+        return False
+    ball.x = hit_x
+    ball.y = y
+    return True
+
+
+def ball_ball(a, b):
+    # Equal-mass elastic collision: swap the velocity components along
+    # the line between centres, if the balls are closing
+    dx = b.x - a.x
+    dy = b.y - a.y
+    reach = a.radius + b.radius
+    d2 = dx * dx + dy * dy
+    if d2 >= reach * reach or d2 == 0 or a.controlled or b.controlled:
+        return False
+    closing = (b.vx - a.vx) * dx + (b.vy - a.vy) * dy
+    if closing >= 0:
+        return False
+    k = closing / d2
+    a.vx += k * dx
+    a.vy += k * dy
+    b.vx -= k * dx
+    b.vy -= k * dy
+    return True
+
+
+def ball_power_up(ball, power_up):
+    # Power-ups are knocked away by balls; the ball keeps its course
+    dx = power_up.x - ball.x
+    dy = power_up.y - ball.y
+    reach = ball.radius + power_up.radius
+    d2 = dx * dx + dy * dy
+    if d2 >= reach * reach or d2 == 0:
+        return False
+    closing = (power_up.vx - ball.vx) * dx + (power_up.vy - ball.vy) * dy
+    if closing >= 0:
+        return False
+    k = 2 * closing / d2
+    power_up.vx -= k * dx
+    power_up.vy -= k * dy
+    return True
+
+
+class Grid:
+    # Singly linked lists of object indexes per cell, in preallocated
+    # arrays; rebuilding each tick allocates nothing unless the object
+    # count outgrows the capacity.
+    def __init__(self, capacity=64):
+        self.head = array('h', [-1] * (COLS * ROWS))
+        self.next = array('h', [-1] * capacity)
+        self.cells = array('h', [0] * capacity)
+        self.capacity = capacity
+        self.count = 0
+
+    def clear(self):
+        head = self.head
+        for i in range(len(head)):
+            head[i] = -1
+        self.count = 0
+
+    def insert(self, x, y):
+        i = self.count
+        if i == self.capacity:
+            self.next.extend(array('h', [-1] * self.capacity))
+            self.cells.extend(array('h', [0] * self.capacity))
+            self.capacity *= 2
+        cx = int(x) // CELL
+        cy = int(y) // CELL
+        if cx < 0:
+            cx = 0
+        elif cx >= COLS:
+            cx = COLS - 1
+        if cy < 0:
+            cy = 0
+        elif cy >= ROWS:
+            cy = ROWS - 1
+        cell = cy * COLS + cx
+        self.cells[i] = cell
+        self.next[i] = self.head[cell]
+        self.head[cell] = i
+        self.count = i + 1
+        return i
+
+
+class Collisions:
+    # Object-object contacts for the current tick: ball-ball and
+    # ball-power-up, found through the grid in O(n) for spread-out
+    # objects. Paddles are handled by hit_paddle, since there are two of
+    # them at fixed x.
+    def __init__(self):
+        self.grid = Grid()
+
+    def update(self, balls, power_ups):
+        grid = self.grid
+        grid.clear()
+        for ball in balls:
+            grid.insert(ball.x, ball.y)
+        if grid.count == 0:
+            return 0
+        for power_up in power_ups:
+            grid.insert(power_up.x, power_up.y)
+
+        head = grid.head
+        link = grid.next
+        cells = grid.cells
+        n = len(balls)
+        contacts = 0
+        for i in range(n):
+            a = balls[i]
+            cell = cells[i]
+            cx = cell % COLS
+            cy = cell // COLS
+            for ny in range(max(cy - 1, 0), min(cy + 2, ROWS)):
+                for nx in range(max(cx - 1, 0), min(cx + 2, COLS)):
+                    j = head[ny * COLS + nx]
+                    while j != -1:
+                        if j > i:
+                            if j < n:
+                                if ball_ball(a, balls[j]):
+                                    contacts += 1
+                            elif ball_power_up(a, power_ups[j - n]):
+                                contacts += 1
+                        j = link[j]
+        return contacts
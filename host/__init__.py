@@ -0,0 +1,86 @@
+"""CPython stand-ins for the MicroPython runtime.
+
+Installing the host runtime lets ``main`` and ``st7789_fb`` run unmodified
+on a desktop: ``machine``, ``framebuf``, ``uasyncio`` and ``micropython``
+resolve to the modules in this package, ``const`` becomes a builtin and the
+``time``/``gc`` modules grow the MicroPython-only helpers the game calls.
+
+    import host
+    host.install()
+    import main
+"""
+import builtins
+import gc
+import sys
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD >> 1
+
+# Heap size reported by gc.mem_free(), roughly what an RP2040 build leaves
+HEAP_SIZE = 192 * 1024
+
+
+def ticks_ms():
+    return int(time.monotonic() * 1000) & TICKS_MAX
+
+
+def ticks_us():
+    return int(time.monotonic() * 1_000_000) & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1_000_000)
+
+
+def mem_alloc():
+    # Only meaningful while tracemalloc is tracing; 0 otherwise
+    import tracemalloc
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+def mem_free():
+    return HEAP_SIZE - mem_alloc()
+
+
+def threshold(amount=None):
+    return -1 if amount is None else None
+
+
+def install():
+    from host import framebuf, machine, micropython, uasyncio
+
+    for name, module in (("machine", machine), ("framebuf", framebuf),
+                         ("uasyncio", uasyncio), ("micropython", micropython)):
+        sys.modules.setdefault(name, module)
+
+    builtins.const = micropython.const
+    for name in ("ptr8", "ptr16", "ptr32", "uint"):
+        setattr(builtins, name, getattr(micropython, name))
+
+    for name, func in (("ticks_ms", ticks_ms), ("ticks_us", ticks_us),
+                       ("ticks_cpu", ticks_us), ("ticks_diff", ticks_diff),
+                       ("ticks_add", ticks_add), ("sleep_ms", sleep_ms),
+                       ("sleep_us", sleep_us)):
+        if not hasattr(time, name):
+            setattr(time, name, func)
+
+    for name, func in (("mem_alloc", mem_alloc), ("mem_free", mem_free),
+                       ("threshold", threshold)):
+        if not hasattr(gc, name):
+            setattr(gc, name, func)
@@ -0,0 +1,10 @@
+"""Run a MicroPython script on the host: ``python -m host [script.py]``"""
+import runpy
+import sys
+
+import host
+
+host.install()
+script = sys.argv[1] if len(sys.argv) > 1 else "main.py"
+sys.argv = sys.argv[1:] or [script]
+runpy.run_path(script, run_name="__main__")
@@ -0,0 +1,438 @@
+"""Headless Pong for many matches at once, stepped in lockstep with NumPy.
+
+Each of the K matches is one column of a set of arrays (ball, paddles,
+paddle power-ups, one floating power-up, scores), and ``Batch.step``
+applies one 60 Hz tick of the rules in ``main.py`` to all of them:
+``Paddle.move``/``update``, the chasing ``ai.AI`` for the right paddle,
+``Ball.move``/``bounce``, ``collision.hit_paddle``/``bounce_walls``,
+goals with the 30-tick goal pause, and power-up pickup.
+
+The left paddle plays like the human side: it is moved by -1/0/+1
+inputs per match, or by ``track`` (follow the ball) when none are given.
+
+Differences from the object model, all only with power-ups enabled:
+there is one floating power-up slot per match instead of a list, and
+multiball is collected but adds no ball.
+
+    python -m host.batch -k 10000 -t 3600     # throughput and results
+    python -m host.batch --parity             # compare with main.Pong
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+FIELD_W = 240
+FIELD_H = 135
+RADIUS = 3
+PADDLE_X = (10, 225)
+PADDLE_W = 5
+PADDLE_H = 20
+PADDLE_ACCEL = 0.5
+PADDLE_MAX_SPEED = 8
+PADDLE_FRICTION = 0.9
+BALL_MAX_SPEED = 6
+GOAL_TICKS = 30
+POWER_UP_TICKS = 300
+POWER_UP_RADIUS = 5
+
+# Power-up type codes; 0 is none. Same order as main.POWER_UP_TYPES.
+POWER_UP_TYPES = ("grow", "shrink", "magnet", "control", "speed", "multiball")
+GROW, SHRINK, MAGNET, CONTROL, SPEED, MULTIBALL = range(1, 7)
+
+
+class Batch:
+    def __init__(self, matches, seed=0, ai_speed=0.75, power_up_chance=0.0):
+        k = matches
+        self.matches = k
+        self.rng = np.random.default_rng(seed)
+        self.power_up_chance = power_up_chance
+        self.ai_speed = np.broadcast_to(np.asarray(ai_speed, dtype=np.float64), (k,)).copy()
+        self.ticks = 0
+
+        self.bx = np.empty(k)
+        self.by = np.empty(k)
+        self.bvx = np.empty(k)
+        self.bvy = np.empty(k)
+        self.bmax = np.empty(k)
+        self.bctl = np.zeros(k, np.int8)  # 0, or 1 + side of the catching paddle
+
+        self.py = np.empty((2, k))
+        self.pv = np.empty((2, k))
+        self.ph = np.empty((2, k))
+        self.ptype = np.zeros((2, k), np.int8)
+        self.ptimer = np.zeros((2, k), np.int16)
+        self.pmag = np.zeros((2, k))
+
+        self.uon = np.zeros(k, bool)
+        self.ux = np.zeros(k)
+        self.uy = np.zeros(k)
+        self.uvx = np.zeros(k)
+        self.uvy = np.zeros(k)
+        self.utype = np.zeros(k, np.int8)
+
+        self.score = np.zeros((2, k), np.int64)
+        self.goals = np.zeros((2, k), np.int64)
+        self.hits = np.zeros(k, np.int64)  # Paddle hits in the current rally
+        self.rallies = np.zeros(k, np.int64)  # Finished rallies ...
+        self.rally_hits = np.zeros(k, np.int64)  # ... and their total hits
+        self.goal_timer = np.zeros(k, np.int16)
+
+        every = np.ones(k, bool)
+        self.reset_ball(every)
+        self.reset_paddles(every)
+
+    def reset_ball(self, mask):
+        n = int(mask.sum())
+        self.bx[mask] = 120
+        self.by[mask] = 67
+        self.bvx[mask] = self.rng.choice((-2.0, 2.0), n)
+        self.bvy[mask] = self.rng.choice((-2.0, 2.0), n)
+        self.bmax[mask] = BALL_MAX_SPEED
+        self.bctl[mask] = 0
+
+    def reset_paddles(self, mask):
+        self.py[:, mask] = 60
+        self.pv[:, mask] = 0
+        self.ph[:, mask] = PADDLE_H
+        self.ptype[:, mask] = 0
+        self.ptimer[:, mask] = 0
+        self.pmag[:, mask] = 0
+
+    def load(self, i, pong):
+        # Copy a main.Pong's first ball and paddles into match i
+        ball = pong.balls[0]
+        self.bx[i] = ball.x
+        self.by[i] = ball.y
+        self.bvx[i] = ball.vx
+        self.bvy[i] = ball.vy
+        self.bmax[i] = ball.max_speed
+        for side, paddle in enumerate(pong.paddles):
+            self.py[side, i] = paddle.y
+            self.pv[side, i] = paddle.velocity
+            self.ph[side, i] = paddle.height
+        self.score[0, i] = pong.score1
+        self.score[1, i] = pong.score2
+
+    def track(self):
+        # Left paddle input that follows the ball, with a 2 px dead band
+        centre = self.py[0] + self.ph[0] / 2
+        return np.where(self.by < centre - 2, -1, np.where(self.by > centre + 2, 1, 0)).astype(np.int8)
+
+    def move_paddle(self, side, direction, mask):
+        # Paddle.move, applied where mask is set
+        v = self.pv[side] + direction * PADDLE_ACCEL
+        v = np.clip(v, -PADDLE_MAX_SPEED, PADDLE_MAX_SPEED)
+        y = np.clip(self.py[side] + v, 0, FIELD_H - self.ph[side])
+        self.py[side] = np.where(mask, y, self.py[side])
+        self.pv[side] = np.where(mask, v * PADDLE_FRICTION, self.pv[side])
+
+    def step(self, left=None):
+        # Matches showing a goal only count down, then restart
+        pausing = self.goal_timer > 0
+        self.goal_timer[pausing] -= 1
+        restart = pausing & (self.goal_timer == 0)
+        if restart.any():
+            self.reset_ball(restart)
+            self.reset_paddles(restart)
+        live = ~pausing
+
+        if left is None:
+            left = self.track()
+        pressed = live & (left != 0)
+        self.move_paddle(0, left, pressed)
+        self.score[0] += np.where(pressed, 10, 0)
+        self.move_paddle(0, 0, live)
+        self.move_paddle(1, 0, live)
+
+        # Paddle.update
+        ticking = live[None, :] & (self.ptimer > 0)
+        self.ptimer[ticking] -= 1
+        expired = ticking & (self.ptimer == 0)
+        self.ph[expired] = PADDLE_H
+        self.ptype[expired] = 0
+
+        # Chasing ai.AI for the right paddle
+        target = self.by - self.ph[1] / 2
+        direction = np.where(self.py[1] < target, 1, np.where(self.py[1] > target, -1, 0))
+        chasing = live & (direction != 0)
+        self.move_paddle(1, direction, chasing)
+        self.pv[1] = np.where(chasing, self.pv[1] * self.ai_speed, self.pv[1])
+
+        self.move_ball(live)
+        self.bounce_walls(live)
+        x0 = self.x0
+        y0 = self.y0
+        hit = self.hit_paddle(0, x0, y0, live)
+        self.paddle_hit(0, hit)
+        hit = self.hit_paddle(1, x0, y0, live & ~hit)
+        self.paddle_hit(1, hit)
+        self.ball_power_up(live)
+
+        left_goal = live & (self.bx < 0)
+        right_goal = live & (self.bx > FIELD_W)
+        scored = left_goal | right_goal
+        self.score[1] += np.where(left_goal, 10_000, 0)
+        self.score[0] += np.where(right_goal, 10_000, 0)
+        self.goals[1] += left_goal
+        self.goals[0] += right_goal
+        self.rallies += scored
+        self.rally_hits += np.where(scored, self.hits, 0)
+        self.hits[scored] = 0
+        self.goal_timer[scored] = GOAL_TICKS
+
+        self.update_power_ups(live)
+        np.minimum(self.score, 999999, out=self.score)
+        self.ticks += 1
+
+    def move_ball(self, live):
+        # Ball.move
+        self.x0 = self.bx.copy()
+        self.y0 = self.by.copy()
+        for side in (0, 1):
+            released = live & (self.bctl == side + 1) & (self.ptype[side] != CONTROL)
+            speed = np.abs(self.bvx)
+            self.bvx = np.where(released, speed if side == 0 else -speed, self.bvx)
+            self.bctl[released] = 0
+
+        free = live & (self.bctl == 0)
+        self.bx = np.where(free, self.bx + self.bvx, self.bx)
+        self.by = np.where(free, self.by + self.bvy, self.by)
+        for side in (0, 1):
+            held = live & (self.bctl == side + 1)
+            if held.any():
+                self.by[held] = self.py[side, held] + self.ph[side, held] / 2
+                if side == 0:
+                    self.bx[held] = PADDLE_X[0] + PADDLE_W + RADIUS
+                else:
+                    self.bx[held] = PADDLE_X[1] - RADIUS
+
+        for side in (0, 1):
+            magnet = live & (self.ptype[side] == MAGNET)
+            if not magnet.any():
+                continue
+            dx = PADDLE_X[side] - self.bx
+            dy = (self.py[side] + self.ph[side] / 2) - self.by
+            distance = (dx**2 + dy**2)**0.5
+            pull = magnet & (distance > 0) & (distance < 50)
+            d = np.where(pull, distance, 1)
+            force = self.pmag[side] / (d**2)
+            self.bvx = np.where(pull, self.bvx + force * dx / d, self.bvx)
+            self.bvy = np.where(pull, self.bvy + force * dy / d, self.bvy)
+
+    def bounce_walls(self, live):
+        # collision.bounce_walls
+        top = live & (self.by - RADIUS <= 0) & (self.bvy < 0)
+        bottom = live & (self.by + RADIUS >= FIELD_H) & (self.bvy > 0)
+        self.bvy = np.where(top | bottom, -self.bvy, self.bvy)
+
+    def hit_paddle(self, side, x0, y0, live):
+        # collision.hit_paddle, swept against the paddle's inner face
+        x1 = self.bx
+        if side == 0:
+            face = PADDLE_X[0] + PADDLE_W
+            moving = (x1 < x0) & (x1 - RADIUS <= face)
+            crossing = moving & (x0 - RADIUS >= face)
+            against = ~crossing & (x0 >= PADDLE_X[0])
+            dx = np.where(crossing, x0 - x1, 1)
+            t = np.where(crossing, (x0 - RADIUS - face) / dx, 1)
+            hit_x = face + RADIUS
+        else:
+            face = PADDLE_X[1]
+            moving = (x1 > x0) & (x1 + RADIUS >= face)
+            crossing = moving & (x0 + RADIUS <= face)
+            against = ~crossing & (x0 <= PADDLE_X[1] + PADDLE_W)
+            dx = np.where(crossing, x1 - x0, 1)
+            t = np.where(crossing, (face - x0 - RADIUS) / dx, 1)
+            hit_x = face - RADIUS
+        y = y0 + (self.by - y0) * t
+        top = self.py[side]
+        hit = (live & (self.bctl == 0) & moving & (crossing | against)
+               & (top <= y) & (y <= top + self.ph[side]))
+        self.bx = np.where(hit, hit_x, self.bx)
+        self.by = np.where(hit, y, self.by)
+        return hit
+
+    def paddle_hit(self, side, hit):
+        if not hit.any():
+            return
+        catch = hit & (self.ptype[side] == CONTROL)
+        self.bctl[catch] = side + 1
+        self.bounce(hit & ~catch, self.pv[side])
+        self.score[side] += np.where(hit, 100, 0)
+        self.hits += hit
+
+    def bounce(self, mask, paddle_velocity):
+        # Ball.bounce
+        vx = -self.bvx
+        vy = self.bvy + paddle_velocity * 0.5
+        speed = (vx**2 + vy**2)**0.5
+        safe = np.where(speed > 0, speed, 1)
+        factor = np.where(speed < self.bmax, (speed + 0.2) / safe,
+                          np.where(speed > self.bmax, self.bmax / safe, 1))
+        self.bvx = np.where(mask, vx * factor, self.bvx)
+        self.bvy = np.where(mask, vy * factor, self.bvy)
+
+    def ball_power_up(self, live):
+        # collision.ball_power_up: the power-up is knocked away
+        dx = self.ux - self.bx
+        dy = self.uy - self.by
+        reach = RADIUS + POWER_UP_RADIUS
+        d2 = dx * dx + dy * dy
+        closing = (self.uvx - self.bvx) * dx + (self.uvy - self.bvy) * dy
+        hit = live & self.uon & (d2 < reach * reach) & (d2 > 0) & (closing < 0)
+        k = np.where(hit, 2 * closing / np.where(hit, d2, 1), 0)
+        self.uvx -= k * dx
+        self.uvy -= k * dy
+
+    def update_power_ups(self, live):
+        k = self.matches
+        spawn = live & ~self.uon & (self.rng.random(k) < self.power_up_chance)
+        n = int(spawn.sum())
+        if n:
+            self.ux[spawn] = self.rng.integers(20, 221, n)
+            self.uy[spawn] = self.rng.integers(20, 116, n)
+            self.uvx[spawn] = self.rng.uniform(-1, 1, n)
+            self.uvy[spawn] = self.rng.uniform(-1, 1, n)
+            self.utype[spawn] = self.rng.integers(1, len(POWER_UP_TYPES) + 1, n)
+            self.uon |= spawn
+
+        # PowerUp.move
+        moving = live & self.uon
+        self.ux = np.where(moving, self.ux + self.uvx, self.ux)
+        self.uy = np.where(moving, self.uy + self.uvy, self.uy)
+        self.uvx = np.where(moving & ((self.ux < 0) | (self.ux > FIELD_W)), -self.uvx, self.uvx)
+        self.uvy = np.where(moving & ((self.uy < 0) | (self.uy > FIELD_H)), -self.uvy, self.uvy)
+
+        taken = np.zeros(k, bool)
+        for side in (0, 1):
+            top = self.py[side]
+            got = (moving & ~taken & (np.abs(self.ux - PADDLE_X[side]) < 10)
+                   & (top <= self.uy) & (self.uy <= top + self.ph[side]))
+            if got.any():
+                self.apply_power_up(side, got)
+                self.score[side] += np.where(got, 1000, 0)
+                taken |= got
+        lost = moving & ~taken & ~((0 <= self.ux) & (self.ux <= FIELD_W) & (0 <= self.uy) & (self.uy <= FIELD_H))
+        self.uon &= ~(taken | lost)
+
+    def apply_power_up(self, side, mask):
+        # Paddle.apply_power_up and Pong.apply_power_up
+        kind = self.utype
+        self.ptype[side, mask] = kind[mask]
+        h = self.ph[side]
+        h = np.where(mask & (kind == GROW), np.minimum(40, h + 10), h)
+        h = np.where(mask & (kind == SHRINK), np.maximum(10, h - 5), h)
+        self.ph[side] = h
+        magnet = mask & (kind == MAGNET)
+        n = int(magnet.sum())
+        if n:
+            self.pmag[side, magnet] = self.rng.choice((-0.5, 0.5), n)
+        self.bmax = np.where(mask & (kind == SPEED), self.bmax * 1.5, self.bmax)
+        self.ptimer[side, mask] = POWER_UP_TICKS
+
+    def run(self, ticks, left=None):
+        for _ in range(ticks):
+            self.step(left)
+
+    def summary(self):
+        goals = self.goals
+        decided = goals[0] != goals[1]
+        rallies = max(int(self.rallies.sum()), 1)
+        return {
+            "matches": self.matches,
+            "ticks": self.ticks,
+            "left_wins": int((goals[0] > goals[1]).sum()),
+            "right_wins": int((goals[1] > goals[0]).sum()),
+            "draws": int((~decided).sum()),
+            "goals": [int(goals[0].sum()), int(goals[1].sum())],
+            "mean_rally_hits": float(self.rally_hits.sum()) / rallies,
+        }
+
+
+def parity(matches=8, ticks=3000, seed=1, tolerance=1e-6):
+    """Step main.Pong and a Batch side by side and report the largest drift.
+
+    Power-ups are off and the right paddle uses the chasing AI at 0.75.
+    After each goal the object model serves with its
+    own random direction, which is copied into the batch so the runs
+    stay comparable. Returns the worst absolute difference seen in ball
+    position and paddle position, and whether scores ever disagreed.
+    """
+    import asyncio
+    import random
+
+    import host
+
+    host.install()
+    import main
+
+    pongs = []
+    for i in range(matches):
+        random.seed(seed + i)
+        pong = main.Pong()
+        pong.game_state = "playing"
+        pong.reset_game()
+        pong.power_up_chance = 0
+        pong.ai = main.ai.AI(0.75, predict=False)
+        pongs.append(pong)
+    batch = Batch(matches, seed=seed, ai_speed=0.75)
+    for i, pong in enumerate(pongs):
+        batch.load(i, pong)
+
+    async def tick(pong, state):
+        await pong.update(state)
+
+    worst = 0.0
+    scores_match = True
+    states = {-1: main.inputs.BTN_U, 0: 0, 1: main.inputs.BTN_D}
+    for _ in range(ticks):
+        left = batch.track()
+        restarting = batch.goal_timer == 1
+        for i, pong in enumerate(pongs):
+            asyncio.run(tick(pong, states[int(left[i])]))
+        batch.step(left)
+        for i, pong in enumerate(pongs):
+            if restarting[i]:
+                batch.bvx[i] = pong.balls[0].vx
+                batch.bvy[i] = pong.balls[0].vy
+            if pong.game_state != "playing":
+                continue
+            ball = pong.balls[0]
+            worst = max(worst, abs(ball.x - batch.bx[i]), abs(ball.y - batch.by[i]),
+                        abs(pong.paddle1.y - batch.py[0, i]), abs(pong.paddle2.y - batch.py[1, i]))
+            if pong.score1 != batch.score[0, i] or pong.score2 != batch.score[1, i]:
+                scores_match = False
+    return {"max_drift": worst, "scores_match": scores_match, "ok": worst <= tolerance and scores_match}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--matches", type=int, default=10_000)
+    parser.add_argument("-t", "--ticks", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ai-speed", type=float, default=0.75)
+    parser.add_argument("--power-ups", type=float, default=0.0, metavar="CHANCE",
+                        help="power-up spawn chance per tick (default: off)")
+    parser.add_argument("--parity", action="store_true", help="check against main.Pong instead")
+    args = parser.parse_args(argv)
+
+    if args.parity:
+        result = parity(seed=args.seed)
+        print("max drift %.3g, scores %s" % (result["max_drift"], "match" if result["scores_match"] else "differ"))
+        return 0 if result["ok"] else 1
+
+    batch = Batch(args.matches, seed=args.seed, ai_speed=args.ai_speed, power_up_chance=args.power_ups)
+    start = time.perf_counter()
+    batch.run(args.ticks)
+    elapsed = time.perf_counter() - start
+    print("%d match-steps in %.2f s: %.0f per second" % (
+        args.matches * args.ticks, elapsed, args.matches * args.ticks / elapsed))
+    for key, value in batch.summary().items():
+        print("%s: %s" % (key, value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,241 @@
+"""Frame-time benchmarks for Pong scenarios.
+
+Each scenario seeds ``random``, builds a ``Pong`` in a known state and
+drives it one tick per frame with a scripted input stream, timing the
+update, draw and show phases separately:
+
+    python -m host.bench                      # all scenarios, table
+    python -m host.bench rally multiball -n 600
+    python -m host.bench --json after.json --compare before.json
+    python -m host.bench --bits 16            # RGB565 instead of main.LCD_BITS
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+
+import host
+
+host.install()
+
+import main  # noqa: E402
+import st7789_fb  # noqa: E402
+from inputs import BTN_D, BTN_U  # noqa: E402
+
+PHASES = ("update", "draw", "show", "frame")
+PERCENTILES = (50, 90, 99)
+
+
+def track_input(pong, paddle, up, down):
+    # Follow the nearest ball, like a player who never misses on purpose
+    if not pong.balls:
+        return 0
+    centre = paddle.y + paddle.height / 2
+    ball = min(pong.balls, key=lambda b: abs(b.x - paddle.x))
+    if ball.y < centre - 2:
+        return up
+    if ball.y > centre + 2:
+        return down
+    return 0
+
+
+def start_playing(pong, balls=1):
+    pong.game_state = "playing"
+    pong.reset_game()
+    pong.power_up_chance = 0
+    for _ in range(balls - 1):
+        pong.balls.append(main.Ball(random.randint(60, 180), random.randint(20, 115), 3))
+
+
+def welcome_setup(pong):
+    pass
+
+
+def welcome_input(pong, frame):
+    # Scroll down, coast, scroll back up, coast
+    phase = frame // 60 % 4
+    return (BTN_D, 0, BTN_U, 0)[phase]
+
+
+def rally_setup(pong):
+    start_playing(pong)
+
+
+def rally_input(pong, frame):
+    return track_input(pong, pong.paddle1, BTN_U, BTN_D)
+
+
+def multiball_setup(pong):
+    start_playing(pong, balls=8)
+
+
+def multiball_input(pong, frame):
+    while len(pong.balls) < 8:
+        pong.balls.append(main.Ball(120, 67, 3))
+    return track_input(pong, pong.paddle1, BTN_U, BTN_D)
+
+
+def stress_setup(pong):
+    start_playing(pong, balls=50)
+
+
+def stress_input(pong, frame):
+    while len(pong.balls) < 50:
+        pong.balls.append(main.Ball(random.randint(60, 180), random.randint(20, 115), 3))
+    return track_input(pong, pong.paddle1, BTN_U, BTN_D)
+
+
+def goal_burst_setup(pong):
+    start_playing(pong)
+
+
+def goal_burst_input(pong, frame):
+    # A goal animation lasts 30 ticks; top the particle pool up to 100 each time
+    if pong.game_state != "goal":
+        pong.start_goal_animation(is_left_goal=frame % 2 == 0)
+        for _ in range(50):
+            pong.particle_system.add_particle(
+                random.randint(0, 240), random.randint(0, 135),
+                random.uniform(-2, 2), random.uniform(-2, 2),
+                random.choice(pong.rainbow_colors), random.randint(30, 90))
+    return 0
+
+
+def power_ups_setup(pong):
+    start_playing(pong)
+
+
+def power_ups_input(pong, frame):
+    while len(pong.power_ups) < 10:
+        pong.power_ups.append(main.PowerUp(random.randint(20, 220), random.randint(20, 115)))
+    return track_input(pong, pong.paddle1, BTN_U, BTN_D)
+
+
+SCENARIOS = {
+    "welcome": (welcome_setup, welcome_input),
+    "rally": (rally_setup, rally_input),
+    "multiball": (multiball_setup, multiball_input),
+    "stress": (stress_setup, stress_input),
+    "goal_burst": (goal_burst_setup, goal_burst_input),
+    "power_ups": (power_ups_setup, power_ups_input),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    i = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+def summarize(samples):
+    values = sorted(samples)
+    stats = {"mean": sum(values) / len(values) if values else 0, "max": values[-1] if values else 0}
+    for pct in PERCENTILES:
+        stats["p%d" % pct] = percentile(values, pct)
+    return stats
+
+
+async def run_scenario(name, frames, seed, warmup, bits):
+    setup, next_input = SCENARIOS[name]
+    random.seed(seed)
+    lcd = st7789_fb.LCD(bits=bits, palette=main.BASE_COLORS)
+    pong = main.Pong()
+    setup(pong)
+    lcd.show()
+
+    samples = {phase: [] for phase in PHASES}
+    spi_bytes = 0
+    clock = time.perf_counter_ns
+    for frame in range(warmup + frames):
+        state = next_input(pong, frame)
+        lcd.spi.reset_stats()
+        t0 = clock()
+        await pong.update(state)
+        t1 = clock()
+        pong.draw(lcd)
+        t2 = clock()
+        lcd.show()
+        lcd.wait_flush()
+        t3 = clock()
+        if frame < warmup:
+            continue
+        samples["update"].append((t1 - t0) // 1000)
+        samples["draw"].append((t2 - t1) // 1000)
+        samples["show"].append((t3 - t2) // 1000)
+        samples["frame"].append((t3 - t0) // 1000)
+        spi_bytes += lcd.spi.bytes_written
+
+    result = {phase: summarize(samples[phase]) for phase in PHASES}
+    result["spi_bytes_per_frame"] = spi_bytes / frames
+    return result
+
+
+def run(names, frames, seed, warmup, bits=main.LCD_BITS):
+    results = {}
+    for name in names:
+        results[name] = asyncio.run(run_scenario(name, frames, seed, warmup, bits))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "frames": frames,
+            "warmup": warmup,
+            "seed": seed,
+            "bits": bits,
+            "unit": "us",
+        },
+        "scenarios": results,
+    }
+
+
+def print_table(report, baseline=None):
+    header = "%-11s %-6s %8s %8s %8s %8s %8s" % ("scenario", "phase", "mean", "p50", "p90", "p99", "max")
+    print(header)
+    print("-" * len(header))
+    for name, result in report["scenarios"].items():
+        base = baseline["scenarios"].get(name) if baseline else None
+        for phase in PHASES:
+            stats = result[phase]
+            line = "%-11s %-6s %8.0f %8d %8d %8d %8d" % (
+                name, phase, stats["mean"], stats["p50"], stats["p90"], stats["p99"], stats["max"])
+            if base and phase in base and base[phase]["p50"]:
+                change = 100.0 * (stats["p50"] - base[phase]["p50"]) / base[phase]["p50"]
+                line += "  p50 %+.1f%%" % change
+            print(line)
+        print("%-11s %-6s %8.0f" % (name, "spi B", result["spi_bytes_per_frame"]))
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help="one of %s (default: all)" % ", ".join(SCENARIOS))
+    parser.add_argument("-n", "--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bits", type=int, choices=sorted(st7789_fb.FORMATS), default=main.LCD_BITS,
+                        help="frame buffer bits per pixel (default: main.LCD_BITS)")
+    parser.add_argument("--json", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="JSON report to compare against")
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario: %s" % name)
+
+    report = run(args.scenarios or list(SCENARIOS), args.frames, args.seed, args.warmup, args.bits)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,416 @@
+"""Pure-Python ``framebuf`` with the same memory layouts as MicroPython.
+
+Pixels are stored in the caller's buffer exactly as the C module does
+(RGB565 little-endian, GS8, GS4_HMSB, MONO_*), so code that slices the
+buffer for SPI transfers sees the same bytes it would on the board.
+
+The built-in 8x8 font is not reproduced: ``text`` draws a deterministic
+placeholder glyph per character with the same cell metrics.
+"""
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+MVLSB = MONO_VLSB
+
+
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+_LOW_NIBBLE = bytes(b & 0x0F for b in range(256))
+
+
+def _glyph(ch):
+    # Seven columns of seven rows, derived from the character code
+    code = ord(ch)
+    if code <= 32 or code > 127:
+        return (0,) * 8
+    seed = (code * 0x9E3779B1) & 0xFFFFFFFF
+    cols = []
+    for i in range(7):
+        seed = (seed * 1103515245 + 12345) & 0xFFFFFFFF
+        cols.append(((seed >> 16) & 0x7F) | 0x01)
+    return tuple(cols) + (0,)
+
+
+_FONT = {}
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        self._buf = memoryview(buffer).cast("B")
+        self._width = width
+        self._height = height
+        self._format = format
+        self._stride = width if stride is None else stride
+        if format == MONO_HLSB or format == MONO_HMSB:
+            self._stride = (self._stride + 7) & ~7
+        elif format == GS2_HMSB:
+            self._stride = (self._stride + 3) & ~3
+        elif format == GS4_HMSB:
+            self._stride = (self._stride + 1) & ~1
+        need = self._size()
+        if len(self._buf) < need:
+            raise ValueError("buffer too small")
+
+    def _size(self):
+        fmt = self._format
+        if fmt == RGB565:
+            return self._stride * self._height * 2
+        if fmt == GS8:
+            return self._stride * self._height
+        if fmt == GS4_HMSB:
+            return self._stride * self._height // 2
+        if fmt == GS2_HMSB:
+            return self._stride * self._height // 4
+        if fmt == MONO_VLSB:
+            return self._stride * ((self._height + 7) // 8)
+        return self._stride * self._height // 8
+
+    # Raw pixel access, no clipping
+
+    def _get(self, x, y):
+        fmt = self._format
+        buf = self._buf
+        if fmt == RGB565:
+            i = (y * self._stride + x) * 2
+            return buf[i] | (buf[i + 1] << 8)
+        if fmt == GS8:
+            return buf[y * self._stride + x]
+        if fmt == GS4_HMSB:
+            i = (y * self._stride + x) >> 1
+            return (buf[i] >> 4) & 0x0F if x % 2 == 0 else buf[i] & 0x0F
+        if fmt == GS2_HMSB:
+            i = (y * self._stride + x) >> 2
+            shift = (3 - (x & 3)) * 2
+            return (buf[i] >> shift) & 0x03
+        if fmt == MONO_VLSB:
+            return (buf[(y >> 3) * self._stride + x] >> (y & 7)) & 1
+        i = (y * self._stride + x) >> 3
+        shift = 7 - (x & 7) if fmt == MONO_HLSB else x & 7
+        return (buf[i] >> shift) & 1
+
+    def _set(self, x, y, c):
+        fmt = self._format
+        buf = self._buf
+        if fmt == RGB565:
+            i = (y * self._stride + x) * 2
+            buf[i] = c & 0xFF
+            buf[i + 1] = (c >> 8) & 0xFF
+        elif fmt == GS8:
+            buf[y * self._stride + x] = c & 0xFF
+        elif fmt == GS4_HMSB:
+            i = (y * self._stride + x) >> 1
+            if x % 2 == 0:
+                buf[i] = ((c & 0x0F) << 4) | (buf[i] & 0x0F)
+            else:
+                buf[i] = (buf[i] & 0xF0) | (c & 0x0F)
+        elif fmt == GS2_HMSB:
+            i = (y * self._stride + x) >> 2
+            shift = (3 - (x & 3)) * 2
+            buf[i] = (buf[i] & ~(0x03 << shift)) | ((c & 0x03) << shift)
+        elif fmt == MONO_VLSB:
+            i = (y >> 3) * self._stride + x
+            bit = 1 << (y & 7)
+            buf[i] = (buf[i] | bit) if c & 1 else (buf[i] & ~bit)
+        else:
+            i = (y * self._stride + x) >> 3
+            bit = 1 << (7 - (x & 7) if fmt == MONO_HLSB else x & 7)
+            buf[i] = (buf[i] | bit) if c & 1 else (buf[i] & ~bit)
+
+    def _fill_rect(self, x, y, w, h, c):
+        if x < 0:
+            w += x
+            x = 0
+        if y < 0:
+            h += y
+            y = 0
+        if x + w > self._width:
+            w = self._width - x
+        if y + h > self._height:
+            h = self._height - y
+        if w <= 0 or h <= 0:
+            return
+        fmt = self._format
+        if fmt == RGB565:
+            row = bytes((c & 0xFF, (c >> 8) & 0xFF)) * w
+            step = self._stride * 2
+            i = (y * self._stride + x) * 2
+            for _ in range(h):
+                self._buf[i:i + w * 2] = row
+                i += step
+        elif fmt == GS8:
+            row = bytes((c & 0xFF,)) * w
+            i = y * self._stride + x
+            for _ in range(h):
+                self._buf[i:i + w] = row
+                i += self._stride
+        elif fmt == GS4_HMSB:
+            # Odd edge pixels one at a time, whole bytes between them
+            c &= 0x0F
+            for yy in range(y, y + h):
+                xx = x
+                end = x + w
+                if xx & 1:
+                    self._set(xx, yy, c)
+                    xx += 1
+                if end & 1 and end > xx:
+                    end -= 1
+                    self._set(end, yy, c)
+                if end > xx:
+                    i = (yy * self._stride + xx) >> 1
+                    self._buf[i:i + (end - xx) // 2] = bytes((c << 4 | c,)) * ((end - xx) // 2)
+        else:
+            for yy in range(y, y + h):
+                for xx in range(x, x + w):
+                    self._set(xx, yy, c)
+
+    def _pixel(self, x, y, c):
+        if 0 <= x < self._width and 0 <= y < self._height:
+            self._set(x, y, c)
+
+    # Public API
+
+    def fill(self, c):
+        self._fill_rect(0, 0, self._width, self._height, c)
+
+    def pixel(self, x, y, c=None):
+        if 0 <= x < self._width and 0 <= y < self._height:
+            if c is None:
+                return self._get(x, y)
+            self._set(x, y, c)
+        elif c is None:
+            return None
+
+    def fill_rect(self, x, y, w, h, c):
+        self._fill_rect(x, y, w, h, c)
+
+    def hline(self, x, y, w, c):
+        self._fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self._fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self._fill_rect(x, y, w, h, c)
+        else:
+            self._fill_rect(x, y, w, 1, c)
+            self._fill_rect(x, y + h - 1, w, 1, c)
+            self._fill_rect(x, y, 1, h, c)
+            self._fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = x2 - x1
+        sx = 1 if dx > 0 else -1
+        dx = abs(dx)
+        dy = y2 - y1
+        sy = 1 if dy > 0 else -1
+        dy = abs(dy)
+        steep = dy > dx
+        if steep:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+        e = 2 * dy - dx
+        for _ in range(dx):
+            if steep:
+                self._pixel(y1, x1, c)
+            else:
+                self._pixel(x1, y1, c)
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        self._pixel(x2, y2, c)
+
+    def _ellipse_points(self, cx, cy, x, y, c, fill, mask):
+        if fill:
+            if mask & 1:
+                self._fill_rect(cx, cy - y, x + 1, 1, c)
+            if mask & 2:
+                self._fill_rect(cx - x, cy - y, x + 1, 1, c)
+            if mask & 4:
+                self._fill_rect(cx - x, cy + y, x + 1, 1, c)
+            if mask & 8:
+                self._fill_rect(cx, cy + y, x + 1, 1, c)
+        else:
+            if mask & 1:
+                self._pixel(cx + x, cy - y, c)
+            if mask & 2:
+                self._pixel(cx - x, cy - y, c)
+            if mask & 4:
+                self._pixel(cx - x, cy + y, c)
+            if mask & 8:
+                self._pixel(cx + x, cy + y, c)
+
+    def ellipse(self, cx, cy, xr, yr, c, f=False, m=0x0F):
+        if xr == 0 and yr == 0:
+            if m & 0x0F:
+                self._pixel(cx, cy, c)
+            return
+        two_a2 = 2 * xr * xr
+        two_b2 = 2 * yr * yr
+        x, y = xr, 0
+        xchange = yr * yr * (1 - 2 * xr)
+        ychange = xr * xr
+        err = 0
+        stop_x, stop_y = two_b2 * xr, 0
+        while stop_x >= stop_y:
+            self._ellipse_points(cx, cy, x, y, c, f, m)
+            y += 1
+            stop_y += two_a2
+            err += ychange
+            ychange += two_a2
+            if 2 * err + xchange > 0:
+                x -= 1
+                stop_x -= two_b2
+                err += xchange
+                xchange += two_b2
+        x, y = 0, yr
+        xchange = yr * yr
+        ychange = xr * xr * (1 - 2 * yr)
+        err = 0
+        stop_x, stop_y = 0, two_a2 * yr
+        while stop_x <= stop_y:
+            self._ellipse_points(cx, cy, x, y, c, f, m)
+            x += 1
+            stop_x += two_b2
+            err += xchange
+            xchange += two_b2
+            if 2 * err + ychange > 0:
+                y -= 1
+                stop_y -= two_a2
+                err += ychange
+                ychange += two_a2
+
+    def text(self, s, x, y, c=1):
+        for ch in s:
+            cols = _FONT.get(ch)
+            if cols is None:
+                cols = _FONT[ch] = _glyph(ch)
+            for i, bits in enumerate(cols):
+                xx = x + i
+                if bits and 0 <= xx < self._width:
+                    for j in range(8):
+                        if bits >> j & 1:
+                            self._pixel(xx, y + j, c)
+            x += 8
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        # Same clipping as the C version: only the overlap is visited
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self._width, x + fbuf._width)
+        y1 = min(self._height, y + fbuf._height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self._format == RGB565 and fbuf._format == RGB565 and palette is None:
+            self._blit_rgb565(fbuf, x, y, x0, y0, x1, y1, key)
+            return
+        if self._format == GS8 and fbuf._format == GS8 and palette is None:
+            self._blit_gs8(fbuf, x, y, x0, y0, x1, y1, key)
+            return
+        if self._format in (RGB565, GS8) and fbuf._format == MONO_HLSB and palette is not None:
+            self._blit_mono(fbuf, x, y, x0, y0, x1, y1, key, palette)
+            return
+        if (self._format == RGB565 and fbuf._format in (GS8, GS4_HMSB)
+                and palette is not None and key == -1):
+            self._blit_expand(fbuf, x, y, x0, y0, x1, y1, palette)
+            return
+        for yy in range(y0, y1):
+            sy = yy - y
+            for xx in range(x0, x1):
+                col = fbuf._get(xx - x, sy)
+                if palette is not None:
+                    col = palette._get(col, 0)
+                if col != key:
+                    self._set(xx, yy, col)
+
+    def _blit_rgb565(self, fbuf, x, y, x0, y0, x1, y1, key):
+        # Row at a time through 16-bit views; the common sprite case
+        dst = self._buf.cast("H")
+        src = fbuf._buf.cast("H")
+        n = x1 - x0
+        for yy in range(y0, y1):
+            d = yy * self._stride + x0
+            s = (yy - y) * fbuf._stride + (x0 - x)
+            if key == -1:
+                dst[d:d + n] = src[s:s + n]
+            else:
+                for i, col in enumerate(src[s:s + n]):
+                    if col != key:
+                        dst[d + i] = col
+
+    def _blit_gs8(self, fbuf, x, y, x0, y0, x1, y1, key):
+        # Sprites of an indexed display
+        dst = self._buf
+        src = fbuf._buf
+        n = x1 - x0
+        for yy in range(y0, y1):
+            d = yy * self._stride + x0
+            s = (yy - y) * fbuf._stride + (x0 - x)
+            if key == -1:
+                dst[d:d + n] = src[s:s + n]
+            else:
+                for i, col in enumerate(src[s:s + n]):
+                    if col != key:
+                        dst[d + i] = col
+
+    def _blit_mono(self, fbuf, x, y, x0, y0, x1, y1, key, palette):
+        # 1-bit source through a two-colour palette, such as text strips
+        dst = self._buf.cast("H") if self._format == RGB565 else self._buf
+        src = fbuf._buf
+        cols = (palette._get(0, 0), palette._get(1, 0))
+        for yy in range(y0, y1):
+            row = (yy - y) * fbuf._stride
+            d = yy * self._stride
+            for xx in range(x0, x1):
+                sx = row + xx - x
+                col = cols[(src[sx >> 3] >> (7 - (sx & 7))) & 1]
+                if col != key:
+                    dst[d + xx] = col
+
+    def _blit_expand(self, fbuf, x, y, x0, y0, x1, y1, palette):
+        # Indices through a palette into RGB565, as an indexed display is
+        # sent: each row of indices is translated to its low and high bytes
+        pal = palette._buf[:palette._width * 2]
+        lo = bytes(pal[0::2]).ljust(256, b"\0")
+        hi = bytes(pal[1::2]).ljust(256, b"\0")
+        dst = self._buf
+        src = fbuf._buf
+        n = x1 - x0
+        for yy in range(y0, y1):
+            sx = x0 - x
+            if fbuf._format == GS8:
+                s = (yy - y) * fbuf._stride + sx
+                idx = bytes(src[s:s + n])
+            else:
+                s = ((yy - y) * fbuf._stride + sx) >> 1
+                packed = bytes(src[s:s + (n + (sx & 1) + 1) // 2])
+                both = bytearray(2 * len(packed))
+                both[0::2] = packed.translate(_HIGH_NIBBLE)
+                both[1::2] = packed.translate(_LOW_NIBBLE)
+                idx = bytes(both[sx & 1:(sx & 1) + n])
+            d = (yy * self._stride + x0) * 2
+            dst[d:d + 2 * n:2] = idx.translate(lo)
+            dst[d + 1:d + 2 * n:2] = idx.translate(hi)
+
+    def scroll(self, xstep, ystep):
+        if xstep < 0:
+            sx, xend, dx = 0, self._width + xstep, 1
+        else:
+            sx, xend, dx = self._width - 1, xstep - 1, -1
+        if ystep < 0:
+            y, yend, dy = 0, self._height + ystep, 1
+        else:
+            y, yend, dy = self._height - 1, ystep - 1, -1
+        while y != yend:
+            x = sx
+            while x != xend:
+                self._set(x, y, self._get(x - xstep, y - ystep))
+                x += dx
+            y += dy
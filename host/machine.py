@@ -0,0 +1,193 @@
+"""Host version of ``machine``.
+
+Pins hold a level that tests and scripts can drive, PWM remembers its
+settings, SPI records traffic instead of clocking it out, and Timer
+calls back from a background thread, which interrupts the main program
+at bytecode boundaries much as a soft IRQ does on the board.
+"""
+import threading
+import time
+
+_freq = 125_000_000
+
+
+def freq(hz=None):
+    global _freq
+    if hz is None:
+        return _freq
+    _freq = hz
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def idle():
+    pass
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self.handler = None
+        self.trigger = 0
+        if value is not None:
+            self.level = 1 if value else 0
+        else:
+            self.level = 1 if pull == Pin.PULL_UP else 0
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            return self.level
+        self.level = 1 if value else 0
+
+    def on(self):
+        self.level = 1
+
+    def off(self):
+        self.level = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def drive(self, value):
+        """Set an input's level from outside, firing its IRQ on an edge"""
+        value = 1 if value else 0
+        if value == self.level:
+            return
+        self.level = value
+        edge = Pin.IRQ_RISING if value else Pin.IRQ_FALLING
+        if self.handler and self.trigger & edge:
+            self.handler(self)
+
+    def __repr__(self):
+        return "Pin(%s)" % (self.id,)
+
+
+class PWM:
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self.frequency = 0
+        self.duty = 0
+        self.writes = 0
+        if freq is not None:
+            self.freq(freq)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, value=None):
+        if value is None:
+            return self.frequency
+        self.frequency = int(value)
+        self.writes += 1
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self.duty
+        self.duty = int(value) & 0xFFFF
+        self.writes += 1
+
+    def deinit(self):
+        self.duty = 0
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1_000_000, *, polarity=0, phase=0,
+                 bits=8, firstbit=MSB, sck=None, mosi=None, miso=None):
+        self.id = id
+        self.bytes_written = 0
+        self.writes = 0
+        self.record = None
+        self.init(baudrate, polarity=polarity, phase=phase)
+
+    def init(self, baudrate=1_000_000, *, polarity=0, phase=0, **kwargs):
+        self.baudrate = baudrate
+        self.polarity = polarity
+        self.phase = phase
+
+    def write(self, buf):
+        self.bytes_written += len(buf)
+        self.writes += 1
+        if self.record is not None:
+            self.record.append(bytes(buf))
+
+    def read(self, nbytes, write=0x00):
+        return bytes([write]) * nbytes
+
+    def readinto(self, buf, write=0x00):
+        for i in range(len(buf)):
+            buf[i] = write
+
+    def write_readinto(self, write_buf, read_buf):
+        self.write(write_buf)
+        for i in range(len(read_buf)):
+            read_buf[i] = 0
+
+    def reset_stats(self):
+        self.bytes_written = 0
+        self.writes = 0
+
+    def deinit(self):
+        pass
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self.thread = None
+        self.stop = None
+        self.calls = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode=PERIODIC, freq=None, period=1000, callback=None, hard=False):
+        self.deinit()
+        interval = 1.0 / freq if freq else period / 1000
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(mode, interval, callback, self.stop),
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self, mode, interval, callback, stop):
+        # Deadlines advance by whole periods, so late calls catch up
+        # rather than drift, as the hardware alarm does
+        deadline = time.perf_counter() + interval
+        while not stop.wait(max(0.0, deadline - time.perf_counter())):
+            self.calls += 1
+            if callback is not None:
+                callback(self)
+            if mode == Timer.ONE_SHOT:
+                break
+            deadline += interval
+
+    def deinit(self):
+        if self.stop is not None:
+            self.stop.set()
+            if self.thread is not threading.current_thread():
+                self.thread.join()
+            self.stop = None
+            self.thread = None
@@ -0,0 +1,65 @@
+"""Host version of the ``micropython`` module.
+
+The code emitters are no-ops here; viper pointer casts become memoryviews
+so viper functions keep working (slowly) under CPython.
+"""
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
+
+
+def ptr8(buf):
+    return memoryview(buf).cast("B")
+
+
+def ptr16(buf):
+    return memoryview(buf).cast("B").cast("H")
+
+
+def ptr32(buf):
+    return memoryview(buf).cast("B").cast("I")
+
+
+uint = int
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+heap_locked = 0
+
+
+def heap_lock():
+    global heap_locked
+    heap_locked += 1
+
+
+def heap_unlock():
+    global heap_locked
+    heap_locked -= 1
+    return heap_locked
+
+
+def mem_info(verbose=False):
+    import gc
+    print("stack: 0 out of 0")
+    print("GC: total: %d, used: %d, free: %d" % (
+        gc.mem_alloc() + gc.mem_free(), gc.mem_alloc(), gc.mem_free()))
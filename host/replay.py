@@ -0,0 +1,120 @@
+"""Record and replay input sessions headlessly.
+
+``play`` feeds a recording made by ``replay.Recorder`` (on the device with
+``main.RECORD_PATH``, or here with ``record``) back into ``main.Pong``
+tick by tick, checks every state hash and times the update and, with
+``--draw``, the draw of each tick. Recordings make a regression corpus for
+both: a changed hash means the simulation changed, and the timings are
+comparable between runs of the same file:
+
+    python -m host.replay record rally.rpl --ticks 3600 --seed 7
+    python -m host.replay play rally.rpl --draw --json timings.json
+
+``record`` presses A on the welcome screen and then follows the ball with
+the left paddle, like ``host.bench``. Device recordings hash float32
+state, so play them on the device; here they replay without matching.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import host
+
+host.install()
+
+import inputs  # noqa: E402
+import main  # noqa: E402
+import replay  # noqa: E402
+import st7789_fb  # noqa: E402
+from host.bench import summarize, track_input  # noqa: E402
+
+START_TICK = 10
+
+
+async def record(path, ticks, seed, hash_every):
+    random.seed(seed)
+    pong = main.Pong()
+    recorder = replay.Recorder(path, seed, hash_every)
+    for tick in range(ticks):
+        if pong.game_state == "welcome":
+            state = inputs.BTN_A << inputs.PRESSED | inputs.BTN_A if tick == START_TICK else 0
+        else:
+            state = track_input(pong, pong.paddle1, inputs.BTN_U, inputs.BTN_D)
+        await pong.update(state)
+        recorder.tick(state, pong)
+    recorder.close()
+    return pong
+
+
+async def play(path, draw):
+    player = replay.Player(path)
+    random.seed(player.seed)
+    pong = main.Pong()
+    lcd = st7789_fb.LCD(bits=main.LCD_BITS, palette=main.BASE_COLORS) if draw else None
+    samples = {"update": [], "draw": []}
+    clock = time.perf_counter_ns
+    while True:
+        state = player.next()
+        if state is None:
+            break
+        t0 = clock()
+        await pong.update(state)
+        t1 = clock()
+        player.check(pong)
+        if lcd:
+            pong.draw(lcd)
+            lcd.show()
+            lcd.wait_flush()
+            samples["draw"].append((clock() - t1) // 1000)
+        samples["update"].append((t1 - t0) // 1000)
+    player.close()
+    return player, samples
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="record a scripted session")
+    rec.add_argument("path")
+    rec.add_argument("--ticks", type=int, default=60 * 60)
+    rec.add_argument("--seed", type=int, default=1)
+    rec.add_argument("--hash-every", type=int, default=1, metavar="TICKS")
+    rep = commands.add_parser("play", help="replay a recording and check its hashes")
+    rep.add_argument("path")
+    rep.add_argument("--draw", action="store_true", help="draw and time every tick as a frame")
+    rep.add_argument("--json", metavar="PATH", help="write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        pong = asyncio.run(record(args.path, args.ticks, args.seed, args.hash_every))
+        print("%s: %d ticks, score %d-%d" % (args.path, args.ticks, pong.score1, pong.score2))
+        return 0
+
+    player, samples = asyncio.run(play(args.path, args.draw))
+    print("%s: seed %d, %d ticks, %d of %d hashes differ" % (
+        args.path, player.seed, player.ticks, player.mismatches, player.checked))
+    if player.first_mismatch is not None:
+        print("first difference after tick %d" % player.first_mismatch)
+    report = {
+        "ticks": player.ticks,
+        "hashes": player.checked,
+        "mismatches": player.mismatches,
+        "first_mismatch": player.first_mismatch,
+    }
+    for phase, values in samples.items():
+        if values:
+            stats = summarize(values)
+            report[phase + "_us"] = stats
+            print("%-6s us  p50 %6d  p90 %6d  p99 %6d  max %6d" % (
+                phase, stats["p50"], stats["p90"], stats["p99"], stats["max"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if player.mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,203 @@
+"""Self-play tournaments between AI players, spread over a process pool.
+
+A player is a difficulty from ``ai.LEVELS`` or a number, which is the
+speed factor of the plain chasing AI. Every pairing of a left and a
+right player plays ``-n`` headless
+``main.Pong`` matches. A match is seeded from its index, runs until one
+side reaches ``--goals`` or ``--max-ticks`` pass, and reports its goals,
+the paddle hits of each rally and its length in ticks. Matches are
+independent, so they are handed to the pool one at a time and the run
+scales with the number of workers:
+
+    python -m host.tournament --left easy medium hard --right hard -n 200
+    python -m host.tournament --left track --right 0.6 0.7 0.8 -o sweep.json
+
+``track`` drives the left paddle with scripted input that follows the
+ball, as ``host.bench`` does, instead of the AI.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+
+main = None
+track_input = None
+LEVEL_NAMES = ("easy", "medium", "hard")
+
+
+def init_worker():
+    global main, track_input
+    import host
+
+    host.install()
+    import main as game
+    from host.bench import track_input as tracker
+
+    main = game
+    track_input = tracker
+
+
+def make_ai(player):
+    # A difficulty name, or a speed factor for the plain chasing AI
+    if player in main.ai.LEVELS:
+        return main.ai.AI(*main.ai.LEVELS[player])
+    return main.ai.AI(player, predict=False)
+
+
+async def play(pong, goals, max_ticks, scripted):
+    goals1 = goals2 = 0
+    rallies = []
+    ticks = 0
+    while ticks < max_ticks and goals1 < goals and goals2 < goals:
+        playing = pong.game_state == "playing"
+        if scripted and playing:
+            state = track_input(pong, pong.paddle1, main.inputs.BTN_U, main.inputs.BTN_D)
+        else:
+            state = 0
+        await pong.update(state)
+        ticks += 1
+        if playing and pong.game_state == "goal":
+            if pong.goal_animation['is_left_goal']:
+                goals2 += 1
+            else:
+                goals1 += 1
+            rallies.append(pong.rally_hits)
+    return goals1, goals2, rallies, ticks
+
+
+def run_match(task):
+    left, right, seed, goals, max_ticks, power_ups = task
+    random.seed(seed)
+    pong = main.Pong()
+    pong.game_state = "playing"
+    pong.reset_game()
+    pong.power_up_chance = power_ups
+    scripted = left == "track"
+    if not scripted:
+        pong.ai_left = make_ai(left)
+    pong.ai = make_ai(right)
+    goals1, goals2, rallies, ticks = asyncio.run(play(pong, goals, max_ticks, scripted))
+    return left, right, goals1, goals2, rallies, ticks
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def aggregate(results):
+    pairings = {}
+    for left, right, goals1, goals2, rallies, ticks in results:
+        entry = pairings.setdefault((left, right), {
+            "matches": 0, "left_wins": 0, "right_wins": 0, "draws": 0,
+            "rallies": [], "ticks": 0, "scores": {},
+        })
+        entry["matches"] += 1
+        if goals1 > goals2:
+            entry["left_wins"] += 1
+        elif goals2 > goals1:
+            entry["right_wins"] += 1
+        else:
+            entry["draws"] += 1
+        entry["rallies"].extend(rallies)
+        entry["ticks"] += ticks
+        score = "%d-%d" % (goals1, goals2)
+        entry["scores"][score] = entry["scores"].get(score, 0) + 1
+
+    report = []
+    for (left, right), entry in sorted(pairings.items(), key=lambda item: (str(item[0][0]), str(item[0][1]))):
+        rallies = sorted(entry.pop("rallies"))
+        n = entry["matches"]
+        entry["left"] = left
+        entry["right"] = right
+        entry["left_win_rate"] = entry["left_wins"] / n
+        entry["mean_ticks"] = entry.pop("ticks") / n
+        entry["rally_hits"] = {
+            "count": len(rallies),
+            "mean": sum(rallies) / len(rallies) if rallies else 0,
+            "p50": percentile(rallies, 50),
+            "p90": percentile(rallies, 90),
+            "max": rallies[-1] if rallies else 0,
+        }
+        entry["scores"] = dict(sorted(entry["scores"].items()))
+        report.append(entry)
+    return report
+
+
+def player(value):
+    if value in LEVEL_NAMES:
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("not a difficulty or speed factor: %r" % value)
+
+
+def left_player(value):
+    # Scripted play drives the left paddle only
+    if value == "track":
+        return value
+    return player(value)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--left", nargs="+", type=left_player, default=list(LEVEL_NAMES),
+                        help="left players: difficulties, chasing speed factors or 'track'")
+    parser.add_argument("--right", nargs="+", type=player, default=list(LEVEL_NAMES),
+                        help="right players: difficulties or chasing speed factors")
+    parser.add_argument("-n", "--matches", type=int, default=100, help="matches per pairing")
+    parser.add_argument("--goals", type=int, default=5, help="goals to win a match")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 5)
+    parser.add_argument("--power-ups", type=float, default=0.02, metavar="CHANCE",
+                        help="power-up spawn chance per tick")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output", metavar="PATH", default="tournament.json")
+    args = parser.parse_args(argv)
+
+    # Seeds depend only on the match's place in its pairing, so every
+    # pairing sees the same serves and results do not depend on -j
+    tasks = [(left, right, args.seed + i, args.goals, args.max_ticks, args.power_ups)
+             for left, right in itertools.product(args.left, args.right)
+             for i in range(args.matches)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.jobs, initializer=init_worker) as pool:
+        results = list(pool.imap_unordered(run_match, tasks))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "jobs": args.jobs,
+            "matches": args.matches,
+            "goals": args.goals,
+            "max_ticks": args.max_ticks,
+            "power_ups": args.power_ups,
+            "seed": args.seed,
+            "seconds": elapsed,
+        },
+        "pairings": aggregate(results),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("%d matches in %.1f s on %d workers" % (len(tasks), elapsed, args.jobs))
+    print("%-6s %-6s %8s %8s %8s" % ("left", "right", "win %", "rally", "ticks"))
+    for entry in report["pairings"]:
+        print("%-6s %-6s %8.1f %8.2f %8.0f" % (
+            entry["left"], entry["right"], 100 * entry["left_win_rate"],
+            entry["rally_hits"]["mean"], entry["mean_ticks"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
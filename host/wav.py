@@ -0,0 +1,74 @@
+"""Render the game's sounds to a WAV file through the synthesiser.
+
+Each named sound is played on a fresh ``main.AudioEngine`` voice pool with
+a simulated clock, and the voices are mixed by ``synth.Synth`` exactly as
+the DMA output does on the device, one block at a time. The result is
+8-bit unsigned mono at ``synth.SAMPLE_RATE``:
+
+    python -m host.wav sounds.wav                       # every sound
+    python -m host.wav hit.wav paddle_hit wall_bounce --gap 0.2
+"""
+import argparse
+import sys
+import wave
+from array import array
+
+import host
+
+host.install()
+
+import main  # noqa: E402
+import synth  # noqa: E402
+
+SOUND_NAMES = ("paddle_hit", "wall_bounce", "power_up", "goal")
+BLOCK_MS = synth.BLOCK * 1000 / synth.SAMPLE_RATE
+
+
+def render(names, gap, tail):
+    # Start each sound gap seconds after the previous one and run until
+    # every voice is silent, or tail seconds after the last start
+    engine = main.AudioEngine()
+    mixer = synth.Synth()
+    block = array("I", [0] * synth.BLOCK)
+    starts = [i * gap * 1000 for i in range(len(names))]
+    end = (starts[-1] if starts else 0) + tail * 1000
+    pending = list(zip(starts, names))
+    samples = bytearray()
+    clock = 0.0
+    while pending or clock < end:
+        now = int(clock)
+        while pending and pending[0][0] <= clock:
+            engine.start_voice(engine.presets[getattr(main, "SOUND_" + pending.pop(0)[1].upper())], now)
+        engine.update(now)
+        mixer.render(engine.voices, block)
+        samples.extend(array("B", block))
+        clock += BLOCK_MS
+        if not pending and all(v.envelope_stage == main.ENV_OFF for v in engine.voices):
+            break
+    return samples
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="WAV file to write")
+    parser.add_argument("sounds", nargs="*", metavar="SOUND",
+                        help="sounds to play, in order (default all): %s" % ", ".join(SOUND_NAMES))
+    parser.add_argument("--gap", type=float, default=1.5, help="seconds between sound starts")
+    parser.add_argument("--tail", type=float, default=3.0, help="longest a sound may ring on")
+    args = parser.parse_args(argv)
+    for name in args.sounds:
+        if name not in SOUND_NAMES:
+            parser.error("unknown sound %r" % name)
+
+    samples = render(args.sounds or SOUND_NAMES, args.gap, args.tail)
+    with wave.open(args.output, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(1)
+        f.setframerate(synth.SAMPLE_RATE)
+        f.writeframes(samples)
+    print("%s: %d samples, %.2f s" % (args.output, len(samples), len(samples) / synth.SAMPLE_RATE))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
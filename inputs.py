@@ -0,0 +1,168 @@
+import machine
+import time
+from array import array
+
+# Button bits of a snapshot. A snapshot packs held | pressed << 8 |
+# long << 16: held buttons are down after debouncing, pressed ones went
+# down since the last snapshot (even if already released again) and long
+# ones have just been held for LONG_MS.
+BTN_A = const(0x01)
+BTN_B = const(0x02)
+BTN_U = const(0x04)
+BTN_D = const(0x08)
+BTN_L = const(0x10)
+BTN_R = const(0x20)
+BTN_C = const(0x40)
+CHORD_AB = const(0x80)  # A and B held together, pressed when both are down
+PRESSED = const(8)
+LONG = const(16)
+
+# Button bit -> GPIO, active low
+PINS = (
+    (BTN_A, 15),
+    (BTN_B, 17),
+    (BTN_U, 2),
+    (BTN_D, 18),
+    (BTN_L, 16),
+    (BTN_R, 20),
+    (BTN_C, 3)
+)
+
+DEBOUNCE_MS = const(20)  # Edges this soon after an accepted change are bounce
+LONG_MS = const(2000)
+RING = const(32)  # Edges buffered between snapshots, a power of two
+
+
+def held(state):
+    return state & 0xFF
+
+
+def pressed(state):
+    return (state >> PRESSED) & 0xFF
+
+
+def long(state):
+    return (state >> LONG) & 0xFF
+
+
+class Inputs:
+    # Pin IRQs timestamp every edge into a preallocated ring; snapshot()
+    # drains it once per tick, so a press is seen however long the frame
+    # took and even if it was released within it. The IRQ is the only
+    # writer of head and snapshot() the only writer of tail.
+    #
+    # Debouncing locks a button out for DEBOUNCE_MS after each accepted
+    # change: the first edge of a press counts at once and the bounce
+    # after it is ignored. If the pin settled elsewhere during the lockout
+    # its last level is taken once the lockout ends.
+    def __init__(self, pins=PINS):
+        self.times = array('i', [0] * RING)
+        self.bits = bytearray(RING)
+        self.levels = bytearray(RING)
+        self.head = 0
+        self.tail = 0
+        self.lost = 0  # Edges dropped on a full ring
+
+        self.held = 0
+        self.pressed = 0
+        self.raw = 0  # Last level seen per button, possibly still bouncing
+        self.changed = array('i', [0] * 8)  # ticks_ms of the last accepted change
+        self.down_at = array('i', [0] * 8)  # ticks_ms each held button went down
+        self.longs = 0  # Held buttons whose long press has fired
+
+        self.pins = []
+        for bit, gpio in pins:
+            pin = machine.Pin(gpio, machine.Pin.IN, machine.Pin.PULL_UP)
+            if pin.value() == 0:
+                self.held |= bit
+                self.raw |= bit
+            pin.irq(self.handler(bit), machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING, hard=True)
+            self.pins.append(pin)
+
+    def handler(self, bit):
+        # One closure per pin, made up front; the IRQ must not allocate
+        def irq(pin):
+            head = self.head
+            next_head = (head + 1) & (RING - 1)
+            if next_head == self.tail:
+                self.lost += 1
+                return
+            self.times[head] = time.ticks_ms()
+            self.bits[head] = bit
+            self.levels[head] = 1 - pin.value()
+            self.head = next_head
+        return irq
+
+    def close(self):
+        for pin in self.pins:
+            pin.irq(None)
+
+    def index(self, bit):
+        i = 0
+        while bit > 1:
+            bit >>= 1
+            i += 1
+        return i
+
+    def locked(self, bit, now):
+        # Within DEBOUNCE_MS of the button's last accepted change. A change
+        # that looks to be in the future is one from before ticks wrapped.
+        return 0 <= time.ticks_diff(now, self.changed[self.index(bit)]) < DEBOUNCE_MS
+
+    def accept(self, bit, down, now):
+        i = self.index(bit)
+        self.changed[i] = now
+        if down:
+            self.held |= bit
+            self.pressed |= bit
+            self.down_at[i] = now
+        else:
+            self.held &= ~bit
+            self.longs &= ~bit
+
+    def snapshot(self):
+        now = time.ticks_ms()
+        tail = self.tail
+        while tail != self.head:
+            t = self.times[tail]
+            bit = self.bits[tail]
+            down = self.levels[tail]
+            tail = (tail + 1) & (RING - 1)
+            if down:
+                self.raw |= bit
+            else:
+                self.raw &= ~bit
+            if bool(self.held & bit) != bool(down) and not self.locked(bit, t):
+                self.accept(bit, down, t)
+        self.tail = tail
+
+        # Settle buttons whose lockout has ended on a different level
+        diff = (self.raw ^ self.held) & 0x7F
+        bit = 1
+        while diff:
+            if diff & bit:
+                diff &= ~bit
+                if not self.locked(bit, now):
+                    self.accept(bit, self.raw & bit, now)
+            bit <<= 1
+
+        held_now = self.held
+        pressed_now = self.pressed
+        self.pressed = 0
+        if held_now & BTN_A and held_now & BTN_B:
+            held_now |= CHORD_AB
+            if pressed_now & (BTN_A | BTN_B):
+                # The chord consumes the press of whichever came second
+                pressed_now = (pressed_now & ~(BTN_A | BTN_B)) | CHORD_AB
+
+        long_now = 0
+        waiting = held_now & ~self.longs & 0x7F
+        bit = 1
+        while waiting:
+            if waiting & bit:
+                waiting &= ~bit
+                if time.ticks_diff(now, self.down_at[self.index(bit)]) >= LONG_MS:
+                    long_now |= bit
+            bit <<= 1
+        self.longs |= long_now
+        return held_now | pressed_now << PRESSED | long_now << LONG
@@ -1,10 +1,36 @@
 import uasyncio as asyncio
 import time
 import machine
+import micropython
 import random
 import math
 import gc
+import framebuf
+from array import array
 import st7789_fb
+import profiler
+import collision
+import ai
+import inputs
+import replay
+import scene
+import synth
+
+# Profiler spans, indexes into SPAN_NAMES
+SPAN_INPUT = const(0)
+SPAN_PLAY = const(1)  # update_playing, including SPAN_POWER
+SPAN_POWER = const(2)
+SPAN_PARTICLES = const(3)
+SPAN_AUDIO = const(4)
+SPAN_GAME = const(5)
+SPAN_INTRO = const(6)
+SPAN_GOAL = const(7)
+SPAN_PAUSE = const(8)
+SPAN_PARTICLES_DRAW = const(9)
+SPAN_HUD = const(10)
+SPAN_SHOW = const(11)
+SPAN_NAMES = ("input", "play", "power", "ptcl", "audio", "game",
+              "intro", "goal", "pause", "pdraw", "hud", "show")
 
 # Color definitions
 class colors:
@@ -32,15 +58,126 @@ class colors:
         b = int(b * brightness)
         return (r << 11) | (g << 5) | b
 
+# Added to an indexed LCD's palette first, so that even 16 entries hold
+# them exactly; shades made with color_brightness take what is left
+BASE_COLORS = (colors.BLACK, colors.WHITE, colors.RED, colors.GREEN, colors.BLUE, colors.CYAN,
+               colors.MAGENTA, colors.YELLOW, colors.ORANGE, colors.INDIGO, colors.VIOLET)
+
+
+# Power-up tables, shared so that nothing is built per frame
+POWER_UP_TYPES = ("grow", "shrink", "magnet", "control", "speed", "multiball")
+POWER_UP_COLORS = {
+    "grow": colors.GREEN,
+    "shrink": colors.RED,
+    "magnet": colors.BLUE,
+    "control": colors.YELLOW,
+    "speed": colors.MAGENTA,
+    "multiball": colors.CYAN
+}
+POWER_UP_LABELS = {t: t.upper() for t in POWER_UP_TYPES}
+
+INSTRUCTIONS = (
+    "Welcome to Pong!",
+    "",
+    "Game Controls:",
+    "Player 1: Joy Up/Down",
+    "Player 2/AI: A/B buttons",
+    "",
+    "Game Elements:",
+    "- Paddles: Control with",
+    "  the above buttons",
+    "- Ball: Bounces between",
+    "  paddles",
+    "- Power-ups: Collect to",
+    "  grow, shrink, change",
+    "  color, speed up, or",
+    "  add multiple balls",
+    "",
+    "Scoring:",
+    "- Score increases with",
+    "  paddle movement and",
+    "  interactions",
+    "- Goals worth millions",
+    "",
+    "Special Controls:",
+    "- Hold A+B: Toggle debug",
+    "- Hold Joy Center (2s):",
+    "  Pause game",
+    "- In pause menu:",
+    "  - A: Resume",
+    "  - B: Return to main menu",
+    "  - Up/Down: Change AI",
+    "    difficulty",
+    "",
+    "Press any button to start",
+    "Scroll with Joy Up/Down"
+)
+
+
+class InstructionStrip:
+    # The instruction text rendered once into a 1-bit strip, 8 rows per
+    # line, with a FrameBuffer view per line. Drawing blits the visible
+    # lines through a white-on-transparent palette instead of rendering
+    # glyphs every frame. The panel's hardware vertical scroll cannot do
+    # this: it moves the controller's 320-line axis, which MADCTL turns
+    # into the horizontal one in this landscape orientation.
+    def __init__(self, lines, color, left=10, top=10, spacing=20):
+        self.left = left
+        self.top = top
+        self.spacing = spacing
+        stride = max(len(line) for line in lines) * 8
+        self.buffer = bytearray(stride * len(lines))  # stride // 8 bytes x 8 rows per line
+        self.lines = []  # FrameBuffer per line, None for blank ones
+        self.widths = array('H', [len(line) * 8 for line in lines])
+        for i, line in enumerate(lines):
+            if not line:
+                self.lines.append(None)
+                continue
+            view = memoryview(self.buffer)[i * stride:(i + 1) * stride]
+            fb = framebuf.FrameBuffer(view, len(line) * 8, 8, framebuf.MONO_HLSB, stride)
+            fb.text(line, 0, 0, 1)
+            self.lines.append(fb)
+        self.color = color
+        # Index 0 stays black, the blit key; index 1 is the text's ink,
+        # set when drawing
+        self.palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+
+    def draw(self, lcd, x, y, scroll):
+        # With track off the lines are unchanged, so only those something
+        # erased or drew over need putting back
+        self.palette.pixel(1, 0, lcd.ink(self.color))
+        unchanged = not lcd.track
+        x += self.left
+        line_y = y + self.top - scroll
+        widths = self.widths
+        for i in range(len(self.lines)):
+            fb = self.lines[i]
+            if fb is not None and -8 < line_y < 135:
+                if not unchanged or lcd.changed(x, line_y, widths[i], 8):
+                    lcd.blit(fb, x, line_y, 0, self.palette, w=widths[i], h=8)
+            line_y += self.spacing
+
 
 class SevenSegmentDisplay:
+    # Digits are pre-rendered into sprites shared by all displays, rebuilt
+    # only when the color or digit height changes. Each display composes
+    # its six digits into one buffer, rebuilt only when the number changes,
+    # so drawing a score is a single blit.
+    digit_sprites = None
+    sprite_color = None  # Ink of the sprites, in an LCD of sprite_bits
+    sprite_bits = None
+    sprite_digit_height = None
+    sprite_generation = 0
+
     def __init__(self, x, y, digit_height):
         self.x = x
         self.y = y
         self.digit_height = digit_height
-        self.digit_width = digit_height * 3 // 5 + 5
-        self.segment_width = max(2, digit_height // 8)
-        self.gap = max(1, digit_height // 16)
+        self.layout()
+        self.number_fb = None
+        self.number_bits = None
+        self.number = None
+        self.number_generation = -1
         self.segments = [
             [(1, 0), (4, 0)],  # Top
             [(4, 0), (4, 2)],  # Top right
@@ -63,11 +200,54 @@ class SevenSegmentDisplay:
             9: [1, 1, 1, 1, 0, 1, 1]
         }
 
+    def layout(self):
+        digit_height = self.digit_height
+        self.digit_width = digit_height * 3 // 5 + 5
+        self.segment_width = max(2, digit_height // 8)
+        self.gap = max(1, digit_height // 16)
+        self.laid_out_height = digit_height
+        # The bottom segment hangs segment_width below digit_height
+        self.sprite_height = digit_height + self.segment_width
+        self.number_width = 6 * (self.digit_width + self.gap)
+        self.number_fb = None
+
+    def render_digits(self, lcd, color):
+        cls = SevenSegmentDisplay
+        x, y = self.x, self.y
+        self.x = self.y = 0
+        sprites = []
+        for digit in range(10):
+            sprite = lcd.sprite(self.digit_width, self.sprite_height)
+            self.draw_digit(sprite, digit, color)
+            sprites.append(sprite)
+        self.x, self.y = x, y
+        cls.digit_sprites = sprites
+        cls.sprite_color = color
+        cls.sprite_bits = lcd.bits
+        cls.sprite_digit_height = self.digit_height
+        cls.sprite_generation += 1
+
+    def render_number(self, lcd, number):
+        if self.number_fb is None or self.number_bits != lcd.bits:
+            self.number_fb = lcd.sprite(self.number_width, self.sprite_height)
+            self.number_bits = lcd.bits
+        else:
+            self.number_fb.fill(0)
+        sprites = SevenSegmentDisplay.digit_sprites
+        x = 0
+        divisor = 100000  # Six digits, zero padded
+        while divisor:
+            self.number_fb.blit(sprites[number // divisor % 10], x, 0)
+            x += self.digit_width + self.gap
+            divisor //= 10
+        self.number = number
+        self.number_generation = SevenSegmentDisplay.sprite_generation
+
     def draw_digit(self, lcd, digit, color):
         segments = self.digit_map[digit]
-        for i, segment in enumerate(self.segments):
+        for i in range(7):
             if segments[i]:
-                start, end = segment
+                start, end = self.segments[i]
                 sx = self.x + start[0] * self.digit_width // 5
                 sy = self.y + start[1] * self.digit_height // 4
                 ex = self.x + end[0] * self.digit_width // 5
@@ -78,11 +258,26 @@ class SevenSegmentDisplay:
                     lcd.fill_rect(sx + self.gap, sy, ex - sx - 2*self.gap, self.segment_width, color)
 
     def draw_number(self, lcd, number, color):
-        original_x = self.x
-        for digit in f"{number:06d}":
-            self.draw_digit(lcd, int(digit), color)
-            self.x += self.digit_width + self.gap
-        self.x = original_x
+        cls = SevenSegmentDisplay
+        color = lcd.ink(color)
+        if self.digit_height != self.laid_out_height:
+            self.layout()
+        if (color != cls.sprite_color or lcd.bits != cls.sprite_bits or
+                self.digit_height != cls.sprite_digit_height):
+            self.render_digits(lcd, color)
+        if (number != self.number or self.number_fb is None or
+                self.number_generation != cls.sprite_generation):
+            self.render_number(lcd, number)
+        # Black is transparent, as when the segments were drawn directly
+        lcd.blit(self.number_fb, self.x, self.y, 0, w=self.number_width, h=self.sprite_height)
+
+# Paddle tint while a power-up is active; others keep the paddle's color
+PADDLE_COLORS = {
+    "grow": colors.GREEN,
+    "shrink": colors.RED,
+    "magnet": colors.BLUE,
+    "control": colors.YELLOW
+}
 
 class Paddle:
     def __init__(self, x, y, width, height):
@@ -117,15 +312,11 @@ class Paddle:
         if self.power_up_type == "rainbow":
             self.rainbow_position = (self.rainbow_position + 5) % 256
             color = colors.color_brightness(colors.CYAN, self.rainbow_position / 255)
-        elif self.power_up_timer > 0:
-            color = {
-                "grow": colors.GREEN,
-                "shrink": colors.RED,
-                "magnet": colors.BLUE,
-                "control": colors.YELLOW
-            }.get(self.power_up_type, self.color)
+        elif self.power_up_timer > 0 and self.power_up_type in PADDLE_COLORS:
+            color = PADDLE_COLORS[self.power_up_type]
         else:
             color = self.color
+        color = lcd.ink(color)
 
         # Draw rounded rectangle
         lcd.fill_rect(int(self.x), int(self.y) + 2, int(self.width), int(self.height) - 4, color)
@@ -165,7 +356,16 @@ class Ball:
         self.controlled_by = None
 
     def move(self, paddles):
-        if self.controlled and self.controlled_by:
+        if self.controlled and self.controlled_by.power_up_type != "control":
+            # Control expired: launch the ball away from the paddle
+            if self.controlled_by.x < 120:
+                self.vx = abs(self.vx)
+            else:
+                self.vx = -abs(self.vx)
+            self.controlled = False
+            self.controlled_by = None
+
+        if self.controlled:
             # Move the ball with the controlling paddle
             self.y = self.controlled_by.y + self.controlled_by.height / 2
             if self.controlled_by.x < 120:  # Left paddle
@@ -182,7 +382,7 @@ class Ball:
                 dx = paddle.x - self.x
                 dy = (paddle.y + paddle.height / 2) - self.y
                 distance = (dx**2 + dy**2)**0.5
-                if distance < 50:  # Magnet effect range
+                if 0 < distance < 50:  # Magnet effect range
                     force = paddle.magnet_strength / (distance**2)
                     self.vx += force * dx / distance
                     self.vy += force * dy / distance
@@ -203,25 +403,23 @@ class Ball:
             self.vy *= factor
 
     def draw(self, lcd):
-        lcd.fill_circle(int(self.x), int(self.y), self.radius, self.color)
+        lcd.fill_circle(int(self.x), int(self.y), self.radius, lcd.ink(self.color))
 
 class PowerUp:
+    # (type, LCD bits, inks) -> pre-rendered sprite, filled on first draw;
+    # a sprite holds inks in its LCD's format, so LCDs cannot share one
+    # unless both match
+    sprites = {}
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
         self.radius = 5
         self.vx = random.uniform(-1, 1)
         self.vy = random.uniform(-1, 1)
-        self.type = random.choice(["grow", "shrink", "magnet", "control", "speed", "multiball"])
-        self.color = {
-            "grow": colors.GREEN,
-            "shrink": colors.RED,
-            "magnet": colors.BLUE,
-            "control": colors.YELLOW,
-            "speed": colors.MAGENTA,
-            "multiball": colors.CYAN
-        }[self.type]
-        self.letter = self.type[0].upper()
+        self.type = random.choice(POWER_UP_TYPES)
+        self.color = POWER_UP_COLORS[self.type]
+        self.letter = POWER_UP_LABELS[self.type][0]
 
     def move(self):
         self.x += self.vx
@@ -231,191 +429,357 @@ class PowerUp:
         if self.y < 0 or self.y > 135:
             self.vy = -self.vy
 
-    def draw(self, lcd):
-        lcd.fill_circle(int(self.x), int(self.y), self.radius, self.color)
-        lcd.text(self.letter, int(self.x) - 3, int(self.y) - 3, colors.WHITE)
-
-class Particle:
-    def __init__(self, x, y, vx, vy, color, lifetime):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.color = color
-        self.lifetime = lifetime
-
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.lifetime -= 1
+    def render_sprite(self, lcd, color, white):
+        r = self.radius
+        sprite = lcd.sprite(2 * r + 1, 2 * r + 1)
+        st7789_fb.fill_circle(sprite, r, r, r, color)
+        sprite.text(self.letter, r - 3, r - 3, white)
+        return sprite
 
     def draw(self, lcd):
-        lcd.pixel(int(self.x), int(self.y), self.color)
+        color = lcd.ink(self.color)
+        white = lcd.ink(colors.WHITE)
+        key = (self.type, lcd.bits, color, white)
+        sprite = PowerUp.sprites.get(key)
+        if sprite is None:
+            sprite = PowerUp.sprites[key] = self.render_sprite(lcd, color, white)
+        size = 2 * self.radius + 1
+        lcd.blit(sprite, int(self.x) - self.radius, int(self.y) - self.radius, 0, w=size, h=size)
 
 class ParticleSystem:
+    # Particles are stored column-wise in preallocated arrays. A new
+    # particle takes the first free slot from next onwards; only when all
+    # are live is the one at next evicted, round-robin. Spawning,
+    # evicting, updating and drawing never allocate.
     def __init__(self, max_particles=100):
-        self.particles = []
         self.max_particles = max_particles
+        self.x = array('f', [0] * max_particles)
+        self.y = array('f', [0] * max_particles)
+        self.vx = array('f', [0] * max_particles)
+        self.vy = array('f', [0] * max_particles)
+        self.color = array('H', [0] * max_particles)
+        self.lifetime = array('H', [0] * max_particles)  # 0 = free slot
+        self.next = 0
+        self.count = 0
 
     def add_particle(self, x, y, vx, vy, color, lifetime):
-        if len(self.particles) < self.max_particles:
-            self.particles.append(Particle(x, y, vx, vy, color, lifetime))
-        else:
-            # Replace the oldest particle
-            self.particles.pop(0)
-            self.particles.append(Particle(x, y, vx, vy, color, lifetime))
-
+        i = self.next
+        if self.count < self.max_particles:
+            while self.lifetime[i]:
+                i += 1
+                if i == self.max_particles:
+                    i = 0
+            self.count += 1
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.color[i] = color
+        self.lifetime[i] = lifetime
+        i += 1
+        self.next = 0 if i == self.max_particles else i
+
+    @micropython.native
     def update(self):
-        self.particles = [p for p in self.particles if p.lifetime > 0]
-        for particle in self.particles:
-            particle.update()
+        if self.count == 0:
+            return
+        x = self.x
+        y = self.y
+        vx = self.vx
+        vy = self.vy
+        lifetime = self.lifetime
+        count = 0
+        for i in range(self.max_particles):
+            life = lifetime[i]
+            if life:
+                x[i] += vx[i]
+                y[i] += vy[i]
+                life -= 1
+                lifetime[i] = life
+                if life:
+                    count += 1
+        self.count = count
 
     def draw(self, lcd):
-        for particle in self.particles:
-            particle.draw(lcd)
-
+        if self.count == 0:
+            return
+        x = self.x
+        y = self.y
+        color = self.color
+        lifetime = self.lifetime
+        if lcd.inks is None:
+            # RGB565: the colours are the inks
+            for i in range(self.max_particles):
+                if lifetime[i]:
+                    lcd.pixel(x[i], y[i], color[i])
+            return
+        ink = lcd.ink
+        for i in range(self.max_particles):
+            if lifetime[i]:
+                lcd.pixel(x[i], y[i], ink(color[i]))
+
+
+# Envelopes are precomputed into PWM duty tables with one entry per
+# ENVELOPE_STEP_MS; a playing sound only indexes them by elapsed time
+ENVELOPE_STEP_MS = const(4)
+ENV_OFF = const(0)
+ENV_ON = const(1)  # Attack, decay, then holding at sustain
+ENV_RELEASE = const(2)
+
+def envelope_shape(x, curve):
+    # 0..1 over 0..1; linear for curve 0, steeper at the start as it grows
+    if curve == 0:
+        return x
+    return (1 - math.exp(-curve * x)) / (1 - math.exp(-curve))
+
+class Envelope:
+    # on: attack up to full level then decay to sustain; release: sustain
+    # down to silence. Levels are stored as duty_u16 values at `volume`.
+    def __init__(self, attack, decay, sustain, release, volume, curve):
+        peak = volume * 655.35
+        na = max(1, int(attack * 1000) // ENVELOPE_STEP_MS)
+        nd = max(1, int(decay * 1000) // ENVELOPE_STEP_MS)
+        nr = max(1, int(release * 1000) // ENVELOPE_STEP_MS)
+        self.on = array('H', [0] * (na + nd))
+        for i in range(na):
+            self.on[i] = int(peak * envelope_shape((i + 1) / na, curve))
+        for i in range(nd):
+            self.on[na + i] = int(peak * (1 - (1 - sustain) * envelope_shape((i + 1) / nd, curve)))
+        self.release = array('H', [0] * nr)
+        for i in range(nr):
+            self.release[i] = int(peak * sustain * (1 - envelope_shape((i + 1) / nr, curve)))
+        self.sustain = int(peak * sustain)
+
+_envelopes = {}
+
+def envelope(attack, decay, sustain, release, volume=50, curve=0):
+    # Sounds with the same parameters share one set of tables
+    key = (attack, decay, sustain, release, volume, curve)
+    env = _envelopes.get(key)
+    if env is None:
+        env = _envelopes[key] = Envelope(attack, decay, sustain, release, volume, curve)
+    return env
+
+# Sound presets, indexed by SOUND_*: waveform, frequency, (attack, decay,
+# sustain, release, curve), timeout in seconds, priority. A sound can only
+# take the voice of one with the same or lower priority.
+SOUND_PADDLE_HIT = const(0)
+SOUND_WALL_BOUNCE = const(1)
+SOUND_POWER_UP = const(2)
+SOUND_GOAL = const(3)
+SOUNDS = (
+    (synth.WAVE_SQUARE, 660, (0.01, 0.05, 0.2, 0.1, 0), 0.2, 2),  # E5 note
+    (synth.WAVE_SINE, 440, (0.01, 0.05, 0.1, 0.1, 0), 0.15, 1),  # A4 note
+    (synth.WAVE_SAW, 880, (0.01, 0.1, 0.3, 0.2, 0), 0.3, 3),  # A5 note
+    (synth.WAVE_NOISE, 220, (0.01, 0.3, 0.5, 0.5, 3), 1.0, 4)  # A3 note
+)
+RELEASE_ALL = const(255)  # Queue code to fade out every voice
+
+AUDIO_PIN = const(0)
+VOICES = const(4)
+AUDIO_HZ = const(1000)  # Envelope and event rate of the audio timer
+AUDIO_QUEUE = const(16)  # Power of two
+
+class Preset:
+    def __init__(self, wave, freq, env, timeout, priority, volume):
+        self.wave = wave
+        self.freq = freq
+        self.envelope = envelope(env[0], env[1], env[2], env[3], volume, env[4])
+        self.timeout = int(timeout * 1000)  # ms, 0 to hold until note_off
+        self.priority = priority
+        self.inc = synth.increment(freq, wave)
+        self.noise = 1 if wave == synth.WAVE_NOISE else 0
+
+class Voice:
+    # Plays one preset's envelope; the AudioEngine owns the PWM and
+    # decides which voice is heard
+    def __init__(self):
+        self.preset = None
+        self.osc = synth.oscillator()
+        self.started = 0  # ticks_ms at note_on
+        self.released = 0  # ticks_ms at note_off
+        self.envelope_stage = ENV_OFF
+        self.duty = 0
+
+    def note_on(self, preset, now):
+        self.preset = preset
+        self.envelope_stage = ENV_ON
+        self.started = now
+        self.duty = preset.envelope.on[0]
+
+    def note_off(self, now):
+        if self.envelope_stage == ENV_ON:
+            self.envelope_stage = ENV_RELEASE
+            self.released = now
+
+    def update(self, now):
+        preset = self.preset
+        env = preset.envelope
+        duty = 0
+        if self.envelope_stage == ENV_ON:
+            elapsed = time.ticks_diff(now, self.started)
+            if preset.timeout and elapsed >= preset.timeout:
+                self.envelope_stage = ENV_RELEASE
+                self.released = time.ticks_add(self.started, preset.timeout)
+            else:
+                i = elapsed // ENVELOPE_STEP_MS
+                duty = env.on[i] if i < len(env.on) else env.sustain
+        if self.envelope_stage == ENV_RELEASE:
+            i = time.ticks_diff(now, self.released) // ENVELOPE_STEP_MS
+            if i < len(env.release):
+                duty = env.release[i]
+            else:
+                self.envelope_stage = ENV_OFF
+        self.duty = duty
+
+def weaker(a, b):
+    # Voice a matters less than b: lower priority, then quieter, then older
+    if a.preset.priority != b.preset.priority:
+        return a.preset.priority < b.preset.priority
+    if a.duty != b.duty:
+        return a.duty < b.duty
+    return time.ticks_diff(a.started, b.started) < 0
 
-class SoundGenerator:
-    def __init__(self, pin_number):
-        self.pwm = machine.PWM(machine.Pin(pin_number))
-        self.pwm.freq(440)  # Default frequency
+class AudioEngine:
+    # A fixed pool of voices sharing one PWM output. New sounds take a
+    # free voice, or steal the lowest-priority one (quietest first, then
+    # oldest), so bursts of sounds never allocate or drop the important
+    # ones. Where DMA is available the voices are synthesised and mixed
+    # into samples (synth.DMAOutput); otherwise the PWM plays the
+    # highest-priority sounding voice as a square tone.
+    #
+    # Voices are run from a machine.Timer at AUDIO_HZ, not from the frame.
+    # The game only posts sound codes into a ring buffer: head is written
+    # by the game alone and tail by the timer alone, so neither side needs
+    # a lock, and the callback works on preallocated state only.
+    def __init__(self, volume=50):
+        self.pwm = machine.PWM(machine.Pin(AUDIO_PIN))
+        self.pwm.freq(440)
         self.pwm.duty_u16(0)  # Start silent
-        
-        self.volume = 50
-        self.attack = 0.01
-        self.decay = 0.1
-        self.sustain = 0.7
-        self.release = 0.3
-        
-        self.start_freq = 440
-        self.min_freq = 110
-        
-        self.current_time = 0
-        self.is_note_on = False
-        self.envelope_stage = 'off'
-        self.timeout = 0  # New timeout attribute
-    
-    def set_frequency(self, freq):
-        self.pwm.freq(int(freq))
-    
+        self.freq = 440
+        self.duty = 0
+        self.volume = volume
+        self.presets = [None] * len(SOUNDS)
+        self.set_volume(volume)
+        self.voices = tuple(Voice() for _ in range(VOICES))
+
+        self.queue = bytearray(AUDIO_QUEUE)
+        self.head = 0  # Next slot the game writes
+        self.tail = 0  # Next slot the timer reads
+        self.timer = None
+        self.profiler = None
+        self.span = 0
+        self.tick_cb = self.tick  # Bound once; the callback must not allocate
+        self.output = None
+
     def set_volume(self, vol):
         self.volume = max(0, min(100, vol))
-    
-    def note_on(self, timeout=0.5):  # Default timeout of 0.5 seconds
-        self.is_note_on = True
-        self.envelope_stage = 'attack'
-        self.current_time = 0
-        self.timeout = timeout
-    
-    def note_off(self):
-        self.is_note_on = False
-        self.envelope_stage = 'release'
-    
-    async def update(self, dt):
-        level = self._calculate_envelope_level()
-        duty = int(level * self.volume * 655.35)  # Scale to 16-bit duty cycle
-        self.pwm.duty_u16(duty)
-        
-        self.current_time += dt
-        
-        # Check for timeout
-        if self.timeout > 0:
-            self.timeout -= dt
-            if self.timeout <= 0:
-                self.note_off()
-    
-    def _calculate_envelope_level(self):
-        if self.envelope_stage == 'attack':
-            level = min(1, self.current_time / self.attack)
-            if level >= 1:
-                self.envelope_stage = 'decay'
-        elif self.envelope_stage == 'decay':
-            level = max(self.sustain, 1 - (1 - self.sustain) * (self.current_time - self.attack) / self.decay)
-            if level <= self.sustain:
-                self.envelope_stage = 'sustain'
-        elif self.envelope_stage == 'sustain':
-            level = self.sustain
-        elif self.envelope_stage == 'release':
-            level = max(0, self.sustain * (1 - (self.current_time / self.release)))
-            if level <= 0:
-                self.envelope_stage = 'off'
-        else:
-            level = 0
-        return level
-
-class SquareWave(SoundGenerator):
-    def __init__(self, pin_number, duty_cycle=0.5):
-        super().__init__(pin_number)
-        self.duty_cycle = duty_cycle
-
-class SawtoothWave(SoundGenerator):
-    pass
-
-class SineWave(SoundGenerator):
-    pass
-
-class NoiseGenerator(SoundGenerator):
-    pass
-
-class AudioEngine:
-    def __init__(self):
-        self.sound_generators = []
-    
-    def add_sound_generator(self, generator):
-        if len(self.sound_generators) < 8:
-            self.sound_generators.append(generator)
-    
-    async def update(self, dt):
-        for generator in self.sound_generators:
-            await generator.update(dt)
-    
-    def remove_inactive_generators(self):
-        self.sound_generators = [gen for gen in self.sound_generators if gen.envelope_stage != 'off']
+        for i in range(len(SOUNDS)):
+            wave, freq, env, timeout, priority = SOUNDS[i]
+            self.presets[i] = Preset(wave, freq, env, timeout, priority, self.volume)
+
+    def start(self, profiler=None, span=0):
+        # Time spent in the callback is charged to `span` of `profiler`
+        self.profiler = profiler
+        self.span = span
+        if synth.rp2 is not None:
+            self.output = synth.DMAOutput(AUDIO_PIN, self.voices)
+        self.timer = machine.Timer(mode=machine.Timer.PERIODIC, freq=AUDIO_HZ, callback=self.tick_cb)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+        if self.output is not None:
+            self.output.stop()
+            self.output = None
+            self.pwm.freq(self.freq)  # Undo the 8-bit sample period
+        self.pwm.duty_u16(0)
+        self.duty = 0
+
+    def post(self, code):
+        # Game side. A full queue drops the new event rather than block.
+        head = self.head
+        next_head = (head + 1) & (AUDIO_QUEUE - 1)
+        if next_head != self.tail:
+            self.queue[head] = code
+            self.head = next_head  # Publish only once the slot is written
+
+    def play(self, sound):
+        self.post(sound)
+
+    def release_all(self):
+        self.post(RELEASE_ALL)
+
+    def tick(self, timer):
+        prof = self.profiler
+        t = prof.start() if prof else 0
+        self.service()
+        if prof:
+            prof.stop(self.span, t)
+
+    def service(self):
+        # Timer side: apply queued events, then step the voices
+        now = time.ticks_ms()
+        tail = self.tail
+        while tail != self.head:
+            code = self.queue[tail]
+            tail = (tail + 1) & (AUDIO_QUEUE - 1)
+            if code == RELEASE_ALL:
+                for voice in self.voices:
+                    voice.note_off(now)
+            else:
+                self.start_voice(self.presets[code], now)
+        self.tail = tail
+        self.update(now)
+        if self.output is not None:
+            self.output.poll()
+
+    def start_voice(self, preset, now):
+        victim = None
+        for voice in self.voices:
+            if voice.envelope_stage == ENV_OFF:
+                victim = voice
+                break
+            if voice.preset.priority <= preset.priority and (victim is None or weaker(voice, victim)):
+                victim = voice
+        if victim is not None:
+            victim.note_on(preset, now)
+
+    def update(self, now):
+        lead = None
+        for voice in self.voices:
+            if voice.envelope_stage != ENV_OFF:
+                voice.update(now)
+                if voice.duty and (lead is None or weaker(lead, voice)):
+                    lead = voice
+        if self.output is not None:
+            return  # The mixer reads the voices directly
+        duty = 0
+        if lead is not None:
+            duty = lead.duty
+            if lead.preset.freq != self.freq:
+                self.freq = lead.preset.freq
+                self.pwm.freq(self.freq)
+        if duty != self.duty:
+            self.duty = duty
+            self.pwm.duty_u16(duty)
 
     def play_paddle_hit(self):
-        hit_sound = SquareWave(0)  # Assuming PWM pin 14 for audio
-        hit_sound.set_frequency(660)  # E5 note
-        hit_sound.attack = 0.01
-        hit_sound.decay = 0.05
-        hit_sound.sustain = 0.2
-        hit_sound.release = 0.1
-        self.add_sound_generator(hit_sound)
-        hit_sound.note_on(timeout=0.2)  # 200ms sound
+        self.post(SOUND_PADDLE_HIT)
 
     def play_wall_bounce(self):
-        bounce_sound = SineWave(0)
-        bounce_sound.set_frequency(440)  # A4 note
-        bounce_sound.attack = 0.01
-        bounce_sound.decay = 0.05
-        bounce_sound.sustain = 0.1
-        bounce_sound.release = 0.1
-        self.add_sound_generator(bounce_sound)
-        bounce_sound.note_on(timeout=0.15)  # 150ms sound
+        self.post(SOUND_WALL_BOUNCE)
 
     def play_power_up_collect(self):
-        powerup_sound = SawtoothWave(0)
-        powerup_sound.set_frequency(880)  # A5 note
-        powerup_sound.attack = 0.01
-        powerup_sound.decay = 0.1
-        powerup_sound.sustain = 0.3
-        powerup_sound.release = 0.2
-        self.add_sound_generator(powerup_sound)
-        powerup_sound.note_on(timeout=0.3)  # 300ms sound
+        self.post(SOUND_POWER_UP)
 
     def play_goal(self):
-        goal_sound = NoiseGenerator(0)
-        goal_sound.set_frequency(220)  # A3 note
-        goal_sound.attack = 0.01
-        goal_sound.decay = 0.3
-        goal_sound.sustain = 0.5
-        goal_sound.release = 0.5
-        self.add_sound_generator(goal_sound)
-        goal_sound.note_on(timeout=1.0)  # 1 second sound
+        self.post(SOUND_GOAL)
 
 class Pong:
     def __init__(self):
-        self.paddle1 = Paddle(10, 60, 5, 20)
-        self.paddle2 = Paddle(225, 60, 5, 20)
+        self.reset_paddles()
         self.balls = [Ball(120, 67, 3)]
         self.score1 = 0
         self.score2 = 0
@@ -425,6 +789,7 @@ class Pong:
         self.frame_count = 0
         self.fps = 0
         self.particle_system = ParticleSystem()
+        self.collisions = collision.Collisions()
         self.goal_animation = None
         self.rainbow_colors = [colors.RED, colors.ORANGE, colors.YELLOW, colors.GREEN, colors.BLUE, colors.INDIGO, colors.VIOLET]
         self.power_ups = []
@@ -437,33 +802,59 @@ class Pong:
         self.return_to_welcome_cooldown = 0
         self.score_color = colors.CYAN
         self.ai_difficulty = "medium"
+        self.ai = ai.AI(*ai.LEVELS[self.ai_difficulty])
+        self.ai_left = None  # An ai.AI to let the AI play the left paddle too
+        self.rally_hits = 0  # Paddle hits since the last serve
         self.paused = False
         self.audio_engine = AudioEngine()
+        self.power_up_chance = 0.02  # Per tick
+        self.profiler = profiler.Profiler(SPAN_NAMES)
+        self.frame_alloc = 0  # Bytes allocated by the last frame, set by main()
+        self.debug_lines = ("", "")
+
+        # Static parts of the screen; see scene.py
+        self.scene = scene.Scene()
+        self.layers = []  # This frame's, reused
+        self.instruction_strip = InstructionStrip(INSTRUCTIONS, colors.WHITE)
+        self.instructions_layer = scene.Layer(0, 0, 240, 135, self.instruction_strip.draw)
+        self.pause_layer = scene.Layer(60, 30, 120, 75, self.draw_pause_menu, cached=True,
+                                       colors=(colors.BLUE, colors.WHITE))
+        self.score_layers = tuple(
+            scene.Layer(d.x, d.y, d.number_width, d.sprite_height,
+                        lambda lcd, x, y, score, d=d: d.draw_number(lcd, score, self.score_color))
+            for d in (self.score_display1, self.score_display2))
+        self.label_layers = (
+            scene.Layer(5, 125, 72, 8, self.draw_label),
+            scene.Layer(185, 125, 55, 8, self.draw_label)
+        )
+        self.debug_layer = scene.Layer(5, 20, 235, 16, self.draw_debug_lines)
     
-    def update_goal(self, event):
+    def update_goal(self, state):
         self.goal_animation['frame'] += 1
         if self.goal_animation['frame'] >= 30:  # Extended goal animation time
             self.goal_animation = None
             self.game_state = "playing"
-            for generator in self.audio_engine.sound_generators:
-                generator.note_off()
+            self.audio_engine.release_all()
             self.reset_ball()
-            self.paddle1 = Paddle(10, 60, 5, 20)  # Reset paddles
-            self.paddle2 = Paddle(225, 60, 5, 20)
+            self.reset_paddles()
+            self.rally_hits = 0
 
-    def update_paused(self, event):
-        if event == "A":
+    def update_paused(self, state):
+        pressed = inputs.pressed(state)
+        if pressed & inputs.BTN_A:
             self.paused = False
             self.game_state = "playing"
-        elif event == "B":
+        elif pressed & inputs.BTN_B:
             self.game_state = "welcome"
             self.instruction_scroll = 0
             self.instruction_velocity = 0
             self.return_to_welcome_cooldown = 30
-        elif event == "U":
+        elif pressed & inputs.BTN_U:
             self.ai_difficulty = "hard" if self.ai_difficulty == "medium" else "medium"
-        elif event == "D":
+            self.ai.set_level(self.ai_difficulty)
+        elif pressed & inputs.BTN_D:
             self.ai_difficulty = "easy" if self.ai_difficulty == "medium" else "medium"
+            self.ai.set_level(self.ai_difficulty)
 
     def start_goal_animation(self, is_left_goal):
         self.game_state = "goal"
@@ -482,93 +873,41 @@ class Pong:
     
     def update_ai(self):
         if self.balls:
-            target_ball = min(self.balls, key=lambda b: abs(b.y - (self.paddle2.y + self.paddle2.height / 2)))
-            target_y = target_ball.y - self.paddle2.height / 2
-            
-            if self.ai_difficulty == "easy":
-                speed_factor = 0.5
-            elif self.ai_difficulty == "medium":
-                speed_factor = 0.75
-            else:  # hard
-                speed_factor = 1.0
-            
-            if self.paddle2.y < target_y:
-                self.paddle2.move("down")
-                self.paddle2.velocity *= speed_factor
-            elif self.paddle2.y > target_y:
-                self.paddle2.move("up")
-                self.paddle2.velocity *= speed_factor
-        
+            self.ai.update(self.paddle2, self.balls)
+            if self.ai_left is not None:  # Self-play
+                self.ai_left.update(self.paddle1, self.balls)
+
     def reset_game(self):
         self.score1 = 0
         self.score2 = 0
+        self.rally_hits = 0
         self.reset_ball()
-        self.paddle1 = Paddle(10, 60, 5, 20)
-        self.paddle2 = Paddle(225, 60, 5, 20)
+        self.reset_paddles()
         self.power_ups = []
         self.balls = [Ball(120, 67, 3)]
     
     def reset_ball(self):
         self.balls = [Ball(120, 67, 3)]
+
+    def reset_paddles(self):
+        self.paddle1 = Paddle(10, 60, 5, 20)
+        self.paddle2 = Paddle(225, 60, 5, 20)
+        self.paddles = (self.paddle1, self.paddle2)
     
-    def show_instructions(self, lcd):
-        lcd.fill(0)
-        instructions = [
-            "Welcome to Pong!",
-            "",
-            "Game Controls:",
-            "Player 1: Joy Up/Down",
-            "Player 2/AI: A/B buttons",
-            "",
-            "Game Elements:",
-            "- Paddles: Control with",
-            "  the above buttons",
-            "- Ball: Bounces between",
-            "  paddles",
-            "- Power-ups: Collect to",
-            "  grow, shrink, change",
-            "  color, speed up, or",
-            "  add multiple balls",
-            "",
-            "Scoring:",
-            "- Score increases with",
-            "  paddle movement and",
-            "  interactions",
-            "- Goals worth millions",
-            "",
-            "Special Controls:",
-            "- Hold A+B: Toggle debug",
-            "- Hold Joy Center (2s):",
-            "  Pause game",
-            "- In pause menu:",
-            "  - A: Resume",
-            "  - B: Return to main menu",
-            "  - Up/Down: Change AI",
-            "    difficulty",
-            "",
-            "Press any button to start",
-            "Scroll with Joy Up/Down"
-        ]
-        y_offset = -self.instruction_scroll
-        for i, line in enumerate(instructions):
-            y = 10 + i * 20 + y_offset
-            if 0 <= y < 135:
-                lcd.text(line, 10, int(y), colors.WHITE)
+    def draw_label(self, lcd, x, y, power_up_type):
+        lcd.text(POWER_UP_LABELS[power_up_type], x, y, lcd.ink(colors.WHITE))
 
-        # Add particles for visual effect
-        if random.random() < 0.1:
-            self.particle_system.add_particle(
-                random.randint(0, 240), 135,
-                random.uniform(-1, 1), random.uniform(-3, -1),
-                random.choice(self.rainbow_colors),
-                random.randint(30, 90)
-            )
+    def draw_debug_lines(self, lcd, x, y, lines):
+        ink = lcd.ink(colors.YELLOW)
+        lcd.text(lines[0], x, y, ink)
+        lcd.text(lines[1], x, y + 8, ink)
     
-    def update_welcome(self, event):
+    def update_welcome(self, state):
         # Smooth scrolling with minimal acceleration
-        if event == "U":
+        held = inputs.held(state)
+        if held & inputs.BTN_U:
             self.instruction_velocity -= 0.5
-        elif event == "D":
+        elif held & inputs.BTN_D:
             self.instruction_velocity += 0.5
         else:
             self.instruction_velocity *= 0.9  # Deceleration
@@ -577,53 +916,67 @@ class Pong:
         self.instruction_scroll += self.instruction_velocity
         self.instruction_scroll = max(0, min(300, self.instruction_scroll))
 
-        if event and event not in ["U", "D"] and self.return_to_welcome_cooldown == 0:
+        # Add particles for visual effect. Spawned here rather than in
+        # draw so the random sequence depends only on ticks, not frames.
+        if random.random() < 0.1:
+            self.particle_system.add_particle(
+                random.randint(0, 240), 135,
+                random.uniform(-1, 1), random.uniform(-3, -1),
+                random.choice(self.rainbow_colors),
+                random.randint(30, 90)
+            )
+
+        start = inputs.pressed(state) & ~(inputs.BTN_U | inputs.BTN_D)
+        if start and self.return_to_welcome_cooldown == 0:
             self.game_state = "playing"
             self.reset_game()
             
-    async def update(self, event):
+    async def update(self, state):
+        # state is an inputs snapshot: held | pressed << 8 | long << 16
+        prof = self.profiler
+        if inputs.pressed(state) & inputs.CHORD_AB:
+            self.debug = not self.debug
+            if self.debug:
+                self.format_debug_lines()  # Not blank until the next FPS update
         if self.game_state == "welcome":
-            self.update_welcome(event)
+            self.update_welcome(state)
         elif self.game_state == "playing":
-            await self.update_playing(event)
+            t = prof.start()
+            self.update_playing(state)
+            prof.stop(SPAN_PLAY, t)
         elif self.game_state == "goal":
-            self.update_goal(event)
+            self.update_goal(state)
         elif self.game_state == "paused":
-            self.update_paused(event)
+            self.update_paused(state)
 
         # Update particles
+        t = prof.start()
         self.particle_system.update()
-
-        # FPS calculation
-        self.frame_count += 1
-        if self.frame_count == 30:
-            current_time = time.ticks_ms()
-            self.fps = 30000 / (current_time - self.last_time)
-            self.last_time = current_time
-            self.frame_count = 0
+        prof.stop(SPAN_PARTICLES, t)
 
         # Update return to welcome cooldown
         if self.return_to_welcome_cooldown > 0:
             self.return_to_welcome_cooldown -= 1
 
-        # Update audio engine
-        await self.audio_engine.update(0.01)  # 10ms update interval
-        self.audio_engine.remove_inactive_generators()
-
-    async def update_playing(self, event):
-        if event == "U":
+    def update_playing(self, state):
+        # Both players' buttons count in the same tick; A+B together is
+        # the debug chord, not a move
+        held = inputs.held(state)
+        if held & inputs.CHORD_AB:
+            held &= ~(inputs.BTN_A | inputs.BTN_B)
+        if held & inputs.BTN_U:
             self.paddle1.move("up")
             self.score1 += 10  # Score for paddle movement
-        elif event == "D":
+        elif held & inputs.BTN_D:
             self.paddle1.move("down")
             self.score1 += 10  # Score for paddle movement
-        elif event == "A":
+        if held & inputs.BTN_A:
             self.paddle2.move("up")
             self.score2 += 10  # Score for paddle movement
-        elif event == "B":
+        elif held & inputs.BTN_B:
             self.paddle2.move("down")
             self.score2 += 10  # Score for paddle movement
-        elif event == "C":
+        if inputs.long(state) & inputs.BTN_C:  # Held for 2 s
             self.paused = True
             self.game_state = "paused"
         
@@ -635,77 +988,87 @@ class Pong:
         self.update_ai()
 
         for ball in self.balls:
-            ball.move([self.paddle1, self.paddle2])
+            x0 = ball.x
+            y0 = ball.y
+            ball.move(self.paddles)
 
-            if ball.y - ball.radius <= 0 or ball.y + ball.radius >= 135:
-                ball.vy = -ball.vy
+            if collision.bounce_walls(ball):
                 self.audio_engine.play_wall_bounce()
 
-            if (ball.x - ball.radius <= self.paddle1.x + self.paddle1.width and
-                self.paddle1.y <= ball.y <= self.paddle1.y + self.paddle1.height):
+            if collision.hit_paddle(ball, x0, y0, self.paddle1):
                 if self.paddle1.power_up_type == "control":
                     ball.controlled = True
                     ball.controlled_by = self.paddle1
                 else:
                     ball.bounce(self.paddle1.velocity)
                 self.score1 += 100  # Score for ball hit
+                self.rally_hits += 1
                 self.add_hit_particles(ball.x, ball.y)
                 self.audio_engine.play_paddle_hit()
-            elif (ball.x + ball.radius >= self.paddle2.x and
-                  self.paddle2.y <= ball.y <= self.paddle2.y + self.paddle2.height):
+            elif collision.hit_paddle(ball, x0, y0, self.paddle2):
                 if self.paddle2.power_up_type == "control":
                     ball.controlled = True
                     ball.controlled_by = self.paddle2
                 else:
                     ball.bounce(self.paddle2.velocity)
                 self.score2 += 100  # Score for ball hit
+                self.rally_hits += 1
                 self.add_hit_particles(ball.x, ball.y)
                 self.audio_engine.play_paddle_hit()
 
+        # Ball-ball and ball-power-up contacts through the grid broadphase
+        self.collisions.update(self.balls, self.power_ups)
+
         # Check for goals
-        for ball in self.balls[:]:
-            if ball.x < 0:
+        balls = self.balls
+        for i in range(len(balls) - 1, -1, -1):
+            if balls[i].x < 0:
                 self.score2 += 10_000  # Score for goal
-                self.balls.remove(ball)
+                balls.pop(i)
                 self.start_goal_animation(is_left_goal=True)
                 self.audio_engine.play_goal()
-            elif ball.x > 240:
+            elif balls[i].x > 240:
                 self.score1 += 10_000  # Score for goal
-                self.balls.remove(ball)
+                balls.pop(i)
                 self.start_goal_animation(is_left_goal=False)
                 self.audio_engine.play_goal()
 
         if not self.balls:
             self.reset_ball()
 
-        await self.update_power_ups()
+        t = self.profiler.start()
+        self.update_power_ups()
+        self.profiler.stop(SPAN_POWER, t)
 
         # Cap scores at 999999
         self.score1 = min(999999, self.score1)
         self.score2 = min(999999, self.score2)
 
-    async def update_power_ups(self):
-        if random.random() < 0.02:
+    def update_power_ups(self):
+        if random.random() < self.power_up_chance:
             self.power_ups.append(PowerUp(random.randint(20, 220), random.randint(20, 115)))
 
         for power_up in self.power_ups:
             power_up.move()
 
-        for power_up in self.power_ups[:]:
+        # Walk backwards so collected and lost power-ups can be removed in place
+        power_ups = self.power_ups
+        for i in range(len(power_ups) - 1, -1, -1):
+            power_up = power_ups[i]
             if (abs(power_up.x - self.paddle1.x) < 10 and
                 self.paddle1.y <= power_up.y <= self.paddle1.y + self.paddle1.height):
                 self.apply_power_up(self.paddle1, power_up)
                 self.score1 += 1000  # Score for power-up collection
-                self.power_ups.remove(power_up)
+                power_ups.pop(i)
                 self.audio_engine.play_power_up_collect()
             elif (abs(power_up.x - self.paddle2.x) < 10 and
                   self.paddle2.y <= power_up.y <= self.paddle2.y + self.paddle2.height):
                 self.apply_power_up(self.paddle2, power_up)
                 self.score2 += 1000  # Score for power-up collection
-                self.power_ups.remove(power_up)
+                power_ups.pop(i)
                 self.audio_engine.play_power_up_collect()
-
-        self.power_ups = [pu for pu in self.power_ups if 0 <= pu.x <= 240 and 0 <= pu.y <= 135]
+            elif not (0 <= power_up.x <= 240 and 0 <= power_up.y <= 135):
+                power_ups.pop(i)
 
     def apply_power_up(self, paddle, power_up):
         paddle.apply_power_up(power_up.type)
@@ -727,34 +1090,72 @@ class Pong:
                 random.randint(15, 30)
             )
 
+    def format_debug_lines(self):
+        self.debug_lines = (
+            f"FPS: {self.fps:.1f} MEM: {gc.mem_free()}",
+            f"WORST: {self.profiler.worst_time}us ALLOC: {self.frame_alloc}"
+        )
+
     def draw(self, lcd):
-        lcd.fill(0)
+        # FPS calculation (rendered frames, not simulation ticks)
+        self.frame_count += 1
+        if self.frame_count == 30:
+            current_time = time.ticks_ms()
+            self.fps = 30000 / time.ticks_diff(current_time, self.last_time)
+            self.last_time = current_time
+            self.frame_count = 0
+            if self.debug:
+                # Formatted here, not every frame, to keep drawing allocation-free
+                self.format_debug_lines()
+
+        prof = self.profiler
+        # Pick this frame's static layers and their keys, then start the
+        # frame: only what changed since the last one is erased
+        layers = self.layers
+        layers.clear()
+        if self.game_state == "welcome":
+            layers.append(self.instructions_layer.set(int(self.instruction_scroll)))
+        elif self.game_state == "paused":
+            layers.append(self.pause_layer.set(self.ai_difficulty))
+        elif self.game_state == "playing":
+            layers.append(self.score_layers[0].set(self.score1))
+            layers.append(self.score_layers[1].set(self.score2))
+        if self.paddle1.power_up_type:
+            layers.append(self.label_layers[0].set(self.paddle1.power_up_type))
+        if self.paddle2.power_up_type:
+            layers.append(self.label_layers[1].set(self.paddle2.power_up_type))
+        if self.debug:
+            layers.append(self.debug_layer.set(self.debug_lines))
+        self.scene.begin(lcd, layers)
+
+        t = prof.start()
         if self.game_state == "welcome":
-            self.show_instructions(lcd)
+            self.instructions_layer.draw(lcd)
+            prof.stop(SPAN_INTRO, t)
         elif self.game_state == "playing":
             self.draw_game(lcd)
+            prof.stop(SPAN_GAME, t)
         elif self.game_state == "goal":
             self.draw_goal_animation(lcd)
+            prof.stop(SPAN_GOAL, t)
         elif self.game_state == "paused":
-            self.draw_pause_menu(lcd)
+            self.pause_layer.draw(lcd)
+            prof.stop(SPAN_PAUSE, t)
 
+        t = prof.start()
         self.particle_system.draw(lcd)
+        prof.stop(SPAN_PARTICLES_DRAW, t)
 
-        # Draw the score only in the playing state
-        if self.game_state == "playing":
-            self.score_display1.draw_number(lcd, self.score1, self.score_color)
-            self.score_display2.draw_number(lcd, self.score2, self.score_color)
-
-        # Draw active power-up names
-        if self.paddle1.power_up_type:
-            lcd.text(self.paddle1.power_up_type.upper(), 5, 125, colors.WHITE)
-        if self.paddle2.power_up_type:
-            lcd.text(self.paddle2.power_up_type.upper(), 185, 125, colors.WHITE)
+        t = prof.start()
+        # Scores (playing only), active power-up names and debug text
+        for layer in layers:
+            if layer is not self.instructions_layer and layer is not self.pause_layer:
+                layer.draw(lcd)
 
         if self.debug:
-            lcd.text(f"FPS: {self.fps:.1f}", 5, 20, colors.YELLOW)
-            lcd.text(f"MEM: {gc.mem_free()} B", 5, 30, colors.YELLOW)
-            lcd.text(f"CPU: {100 * machine.freq() / 1000000:.1f}%", 5, 40, colors.YELLOW)
+            # Bars are scaled to one simulation tick
+            prof.draw(lcd, 5, 37, TICK_US, lcd.ink(colors.YELLOW), lcd.ink(colors.GREEN), lcd.ink(colors.RED))
+        prof.stop(SPAN_HUD, t)
 
     def draw_game(self, lcd):
         self.paddle1.draw(lcd)
@@ -775,11 +1176,11 @@ class Pong:
         for i, char in enumerate(text):
             color_index = (i + self.goal_animation['frame'] // 5) % len(self.rainbow_colors)
             color = self.rainbow_colors[color_index]
-            lcd.text(char, x + i * 8, y, color)
+            lcd.text(char, x + i * 8, y, lcd.ink(color))
 
         # Draw expanding circles
         radius = min(100, self.goal_animation['frame'] * 2)
-        lcd.circle(120, 67, radius, colors.color_brightness(colors.WHITE, 1 - radius / 100))
+        lcd.circle(120, 67, radius, lcd.ink(colors.color_brightness(colors.WHITE, 1 - radius / 100)))
 
         # Draw game objects
         self.paddle1.draw(lcd)
@@ -789,65 +1190,128 @@ class Pong:
         for power_up in self.power_ups:
             power_up.draw(lcd)
 
-    def draw_pause_menu(self, lcd):
-        lcd.fill_rect(60, 30, 120, 75, colors.BLUE)
-        lcd.rect(60, 30, 120, 75, colors.WHITE)
-        lcd.text("PAUSED", 95, 40, colors.WHITE)
-        lcd.text("A: Resume", 70, 60, colors.WHITE)
-        lcd.text("B: Main Menu", 70, 75, colors.WHITE)
-        lcd.text(f"AI: {self.ai_difficulty}", 70, 90, colors.WHITE)
+    def draw_pause_menu(self, fb, x, y, difficulty, blue, white):
+        # Rendered into the pause layer's buffer once per difficulty
+        fb.fill_rect(x, y, 120, 75, blue)
+        fb.rect(x, y, 120, 75, white)
+        fb.text("PAUSED", x + 35, y + 10, white)
+        fb.text("A: Resume", x + 10, y + 30, white)
+        fb.text("B: Main Menu", x + 10, y + 45, white)
+        fb.text(f"AI: {difficulty}", x + 10, y + 60, white)
 
     def is_running(self):
         return self.running
 
 
-# Hardware setup
-sw_a = machine.Pin(15, machine.Pin.IN, machine.Pin.PULL_UP)
-sw_b = machine.Pin(17, machine.Pin.IN, machine.Pin.PULL_UP)
-joy_u = machine.Pin(2, machine.Pin.IN, machine.Pin.PULL_UP)
-joy_d = machine.Pin(18, machine.Pin.IN, machine.Pin.PULL_UP)
-joy_l = machine.Pin(16, machine.Pin.IN, machine.Pin.PULL_UP)
-joy_r = machine.Pin(20, machine.Pin.IN, machine.Pin.PULL_UP)
-joy_c = machine.Pin(3, machine.Pin.IN, machine.Pin.PULL_UP)
+# Hardware setup; the buttons belong to inputs.Inputs
 bl = machine.Pin(13, machine.Pin.OUT)
 bl.value(1)
 
+# The game rules count in ticks (a power-up lasts 300 ticks, "5 seconds"),
+# so the simulation always steps at TICK_HZ and rendering takes whatever
+# time is left. When a frame runs long, ticks are caught up before the
+# next render, up to MAX_CATCH_UP, beyond which the game slows down.
+TICK_HZ = const(60)
+TICK_US = const(1_000_000 // TICK_HZ)
+MAX_CATCH_UP = const(5)
+
+# Frame buffer bits per pixel. 16 is RGB565, 64.8 KB per buffer, sent
+# by DMA. 8 or 4 make the buffer palette indexed, a half or a quarter
+# of that (the flush copy shrinks too), for boards short of heap: the
+# game needs about 40 colours, so 8 bits shows them all and 4 bits maps
+# shades to the nearest of 16. Indexed frames are expanded to RGB565 as
+# they are sent, which needs the flush thread instead of DMA.
+LCD_BITS = const(16)
+
+# Print per-span frame timings over serial once per profiler window
+PROFILE_SERIAL = False
+
+# Record the session's seed and inputs to this file (see replay.py), and/or
+# play one back instead of reading the buttons, e.g. "spike.rpl"
+RECORD_PATH = None
+REPLAY_PATH = None
+
+# Garbage is collected in the idle time before a tick once this much has
+# been allocated since the last collection. gc.threshold() is a backstop
+# that only fires mid-frame if idle time never comes.
+GC_IDLE_THRESHOLD = const(8 * 1024)
+GC_BACKSTOP_THRESHOLD = const(32 * 1024)
+
 async def main():
-    lcd = st7789_fb.LCD()
+    # Frame N is sent in the background while frame N+1 is updated and drawn
+    lcd = st7789_fb.LCD(flush="auto", bits=LCD_BITS, palette=BASE_COLORS)
+    player = replay.Player(REPLAY_PATH) if REPLAY_PATH else None
+    seed = player.seed if player else time.ticks_us()
+    random.seed(seed)  # Before Pong(), whose first ball takes a random serve
+    recorder = replay.Recorder(RECORD_PATH, seed) if RECORD_PATH else None
     pong = Pong()
+    buttons = inputs.Inputs()
     lcd.show()
     
+    prof = pong.profiler
+    prof.stream = PROFILE_SERIAL
+    pong.audio_engine.start(prof, SPAN_AUDIO)
+    gc.collect()
+    gc.threshold(GC_BACKSTOP_THRESHOLD)
+    collected_at = gc.mem_alloc()
+    lag = 0
+    last = time.ticks_us()
     while pong.is_running():
-        if sw_a.value() == 0 and sw_b.value() == 0:
-            pong.debug = not pong.debug
+        now = time.ticks_us()
+        lag += time.ticks_diff(now, last)
+        last = now
+        if lag > MAX_CATCH_UP * TICK_US:
+            lag = MAX_CATCH_UP * TICK_US
+        if lag < TICK_US:
+            if recorder:
+                recorder.flush()
+            if gc.mem_alloc() - collected_at > GC_IDLE_THRESHOLD:
+                gc.collect()
+                collected_at = gc.mem_alloc()
+                continue  # Recheck the clock, collecting took time
+            await asyncio.sleep_ms((TICK_US - lag) // 1000)
+            continue
         
-        if sw_a.value() == 0:
-            event = "A"
-        elif sw_b.value() == 0:
-            event = "B"
-        elif joy_u.value() == 0:
-            event = "U"
-        elif joy_d.value() == 0:
-            event = "D"
-        elif joy_l.value() == 0:
-            event = "L"
-        elif joy_r.value() == 0:
-            event = "R"
-        elif joy_c.value() == 0:
-            event = "C"
-        else:
-            event = ""
+        frame_start_alloc = gc.mem_alloc()
+        prof.enabled = pong.debug or prof.stream
         
-        await pong.update(event)
+        # Edges were captured by the pin IRQs; each tick takes its own
+        # snapshot so a press lands in exactly one tick
+        while lag >= TICK_US:
+            t = prof.start()
+            state = buttons.snapshot()
+            if player:
+                state = player.next()
+                if state is None:
+                    pong.running = False
+                    break
+            prof.stop(SPAN_INPUT, t)
+            await pong.update(state)
+            if recorder:
+                recorder.tick(state, pong)
+            if player and not player.check(pong) and player.mismatches == 1:
+                print("replay: state differs from tick", player.ticks)
+            lag -= TICK_US
         pong.draw(lcd)
+        t = prof.start()
         lcd.show()
-        
-        await asyncio.sleep_ms(10)
+        prof.stop(SPAN_SHOW, t)
+        prof.end_frame()
+        # Allocation per frame; negative only if the backstop collected
+        pong.frame_alloc = gc.mem_alloc() - frame_start_alloc
+    
+    pong.audio_engine.stop()
+    buttons.close()
+    if recorder:
+        recorder.close()
+    if player:
+        print("replay: %d ticks, %d of %d hashes differ" % (player.ticks, player.mismatches, player.checked))
+        player.close()
+    lcd.wait_flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
-
-print("done")
+    print("done")
 
 
 
@@ -0,0 +1,128 @@
+import time
+from array import array
+
+
+class Profiler:
+    # Times named spans with ticks_us. Spans are small integers indexing
+    # preallocated arrays, so timing a span never allocates. Statistics
+    # are gathered over `window` frames and then published as min/avg/max
+    # per span, along with the span breakdown of the slowest frame.
+    def __init__(self, names, window=60):
+        n = len(names)
+        self.names = names
+        self.window = window
+        self.enabled = False
+        self.stream = False
+        self.frames = 0
+        self.frame_start = time.ticks_us()
+
+        self.current = array('l', [0] * n)  # This frame, per span
+        self.total = array('l', [0] * n)  # This window, per span
+        self.low = array('l', [0x7FFFFFFF] * n)
+        self.high = array('l', [0] * n)
+        self.slowest = array('l', [0] * n)
+        self.slowest_time = 0
+        self.frame_total = 0
+        self.frame_low = 0x7FFFFFFF
+        self.frame_high = 0
+
+        # Published at the end of each window
+        self.min = array('l', [0] * n)
+        self.avg = array('l', [0] * n)
+        self.max = array('l', [0] * n)
+        self.worst = array('l', [0] * n)
+        self.worst_time = 0
+        self.frame_min = 0
+        self.frame_avg = 0
+        self.frame_max = 0
+
+    def start(self):
+        return time.ticks_us() if self.enabled else 0
+
+    def stop(self, span, start):
+        if self.enabled:
+            self.current[span] += time.ticks_diff(time.ticks_us(), start)
+
+    def end_frame(self):
+        now = time.ticks_us()
+        frame_time = time.ticks_diff(now, self.frame_start)
+        self.frame_start = now
+        if not self.enabled:
+            return
+
+        current = self.current
+        total = self.total
+        low = self.low
+        high = self.high
+        slowest = frame_time > self.slowest_time
+        if slowest:
+            self.slowest_time = frame_time
+        for i in range(len(current)):
+            t = current[i]
+            total[i] += t
+            if t < low[i]:
+                low[i] = t
+            if t > high[i]:
+                high[i] = t
+            if slowest:
+                self.slowest[i] = t
+            current[i] = 0
+        self.frame_total += frame_time
+        if frame_time < self.frame_low:
+            self.frame_low = frame_time
+        if frame_time > self.frame_high:
+            self.frame_high = frame_time
+
+        self.frames += 1
+        if self.frames >= self.window:
+            self.publish()
+            if self.stream:
+                self.report()
+
+    def publish(self):
+        n = self.frames
+        for i in range(len(self.total)):
+            self.min[i] = self.low[i]
+            self.avg[i] = self.total[i] // n
+            self.max[i] = self.high[i]
+            self.worst[i] = self.slowest[i]
+            self.total[i] = 0
+            self.low[i] = 0x7FFFFFFF
+            self.high[i] = 0
+        self.worst_time = self.slowest_time
+        self.frame_min = self.frame_low
+        self.frame_avg = self.frame_total // n
+        self.frame_max = self.frame_high
+        self.slowest_time = 0
+        self.frame_total = 0
+        self.frame_low = 0x7FFFFFFF
+        self.frame_high = 0
+        self.frames = 0
+
+    def report(self):
+        # Two compact lines per window: min/avg/max per span in us, then
+        # the breakdown of the worst frame
+        line = "prof frame=%d/%d/%d" % (self.frame_min, self.frame_avg, self.frame_max)
+        for i, name in enumerate(self.names):
+            line += " %s=%d/%d/%d" % (name, self.min[i], self.avg[i], self.max[i])
+        print(line)
+        line = "worst frame=%d" % self.worst_time
+        for i, name in enumerate(self.names):
+            line += " %s=%d" % (name, self.worst[i])
+        print(line)
+
+    def draw(self, lcd, x, y, budget_us, color, bar_color, peak_color):
+        # One row per span: name, a bar for the average and a tick for the
+        # maximum, scaled so the full bar width is budget_us
+        bar_x = x + 48
+        width = 240 - bar_x - 4
+        for i, name in enumerate(self.names):
+            lcd.text(name, x, y, color)
+            avg = self.avg[i] * width // budget_us
+            peak = self.max[i] * width // budget_us
+            if avg > 0:
+                lcd.fill_rect(bar_x, y + 1, min(avg, width), 6, bar_color)
+            if peak > 0:
+                lcd.vline(bar_x + min(peak, width), y, 8, peak_color)
+            y += 8
+        return y
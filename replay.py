@@ -0,0 +1,170 @@
+import binascii
+import struct
+from array import array
+
+# A recording is a header followed by records:
+#   header  "PRP1", u32 seed, u16 hash_every
+#   RUN     u8 1, u32 input state, u8 ticks    -- the same state for 1..255 ticks
+#   HASH    u8 2, u32 state hash              -- after every hash_every'th tick
+# all little endian. Hashes are written as their tick ends and runs when
+# they end, so every hash appears before the run holding its tick.
+MAGIC = b"PRP1"
+HEADER = "<4sIH"
+HEADER_SIZE = const(10)
+RUN = const(1)
+HASH = const(2)
+RUN_SIZE = const(6)
+HASH_SIZE = const(5)
+MAX_RUN = const(255)
+BUFFER = const(512)  # Bytes buffered before the recorder writes to flash
+
+GAME_STATES = ("welcome", "playing", "goal", "paused")
+POWER_UPS = (None, "grow", "shrink", "magnet", "control", "speed", "multiball")
+
+# Positions and speeds are hashed as fixed point with this many fractional
+# bits. The device computes in float32 and the host in double, so a
+# recording only replays hash for hash on the kind of machine that made
+# it; across the two the inputs still replay, but states drift apart.
+FIXED = 256
+
+
+class Hasher:
+    # CRC32 of the simulation state, packed into a reused word array so
+    # hashing every tick allocates nothing until the object count grows
+    def __init__(self):
+        self.words = array('i', [0] * 64)
+
+    def __call__(self, pong):
+        words = self.words
+        n = 6 + 6 * 2 + 4 * len(pong.balls) + 3 * len(pong.power_ups)
+        if n > len(words):
+            words.extend(array('i', [0] * n))
+        words[0] = GAME_STATES.index(pong.game_state)
+        words[1] = pong.score1 & 0x7FFFFFFF
+        words[2] = pong.score2 & 0x7FFFFFFF
+        words[3] = len(pong.balls)
+        words[4] = len(pong.power_ups)
+        words[5] = pong.particle_system.count
+        i = 6
+        for paddle in pong.paddles:
+            words[i] = int(paddle.y * FIXED)
+            words[i + 1] = int(paddle.velocity * FIXED)
+            words[i + 2] = int(paddle.height)
+            words[i + 3] = POWER_UPS.index(paddle.power_up_type)
+            words[i + 4] = paddle.power_up_timer
+            words[i + 5] = int(paddle.magnet_strength * FIXED)
+            i += 6
+        for ball in pong.balls:
+            words[i] = int(ball.x * FIXED)
+            words[i + 1] = int(ball.y * FIXED)
+            words[i + 2] = int(ball.vx * FIXED)
+            words[i + 3] = int(ball.vy * FIXED)
+            i += 4
+        for power_up in pong.power_ups:
+            words[i] = int(power_up.x * FIXED)
+            words[i + 1] = int(power_up.y * FIXED)
+            words[i + 2] = POWER_UPS.index(power_up.type)
+            i += 3
+        return binascii.crc32(memoryview(words)[:n])
+
+
+class Recorder:
+    # Logs the seed and each tick's input state, run-length encoded, plus
+    # a state hash every hash_every ticks. Records collect in a RAM buffer;
+    # call flush() when there is idle time so the flash write does not
+    # land in the middle of a frame.
+    def __init__(self, path, seed, hash_every=1):
+        self.file = open(path, "wb")
+        self.file.write(struct.pack(HEADER, MAGIC, seed, hash_every))
+        self.hash_every = hash_every
+        self.hash = Hasher()
+        self.buffer = bytearray(BUFFER)
+        self.used = 0
+        self.state = -1
+        self.run = 0
+        self.ticks = 0
+
+    def tick(self, state, pong):
+        # Call after pong.update(state)
+        if state != self.state or self.run == MAX_RUN:
+            self.end_run()
+            self.state = state
+        self.run += 1
+        self.ticks += 1
+        if self.ticks % self.hash_every == 0:
+            if self.used + HASH_SIZE > BUFFER:
+                self.flush()
+            struct.pack_into("<BI", self.buffer, self.used, HASH, self.hash(pong))
+            self.used += HASH_SIZE
+
+    def end_run(self):
+        if self.run:
+            if self.used + RUN_SIZE > BUFFER:
+                self.flush()
+            struct.pack_into("<BIB", self.buffer, self.used, RUN, self.state, self.run)
+            self.used += RUN_SIZE
+            self.run = 0
+
+    def flush(self):
+        if self.used:
+            self.file.write(memoryview(self.buffer)[:self.used])
+            self.used = 0
+
+    def close(self):
+        self.end_run()
+        self.flush()
+        self.file.close()
+
+
+class Player:
+    # Feeds a recording back one tick at a time. Seed random with .seed
+    # before building the Pong, pass next() to pong.update and call
+    # check(pong) after it; mismatches counts the ticks whose state hash
+    # differs and first_mismatch is the first of them.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        magic, self.seed, self.hash_every = struct.unpack(HEADER, self.file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("not a recording: %r" % path)
+        self.hash = Hasher()
+        self.hashes = []  # Read ahead of the run they belong to
+        self.record = bytearray(RUN_SIZE)
+        self.state = 0
+        self.left = 0  # Ticks left in the current run
+        self.ticks = 0
+        self.checked = 0
+        self.mismatches = 0
+        self.first_mismatch = None
+
+    def next(self):
+        # The input state for the next tick, or None at the end
+        while self.left == 0:
+            record = self.record
+            if self.file.readinto(memoryview(record)[:1]) != 1:
+                return None
+            if record[0] == HASH:
+                self.file.readinto(memoryview(record)[:HASH_SIZE - 1])
+                self.hashes.append(struct.unpack_from("<I", record)[0])
+            elif record[0] == RUN:
+                self.file.readinto(memoryview(record)[:RUN_SIZE - 1])
+                self.state, self.left = struct.unpack_from("<IB", record)
+            else:
+                raise ValueError("bad record %d" % record[0])
+        self.left -= 1
+        self.ticks += 1
+        return self.state
+
+    def check(self, pong):
+        if self.ticks % self.hash_every or not self.hashes:
+            return True
+        expected = self.hashes.pop(0)
+        self.checked += 1
+        if self.hash(pong) == expected:
+            return True
+        self.mismatches += 1
+        if self.first_mismatch is None:
+            self.first_mismatch = self.ticks
+        return False
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,107 @@
+# Retained layers on top of the LCD's damage tracking. A frame is
+#
+#     scene.begin(lcd, layers)  # the static layers this frame, keys set
+#     ...draw moving objects, and each layer in layers with layer.draw()
+#
+# A static layer's look is named by its key. While a layer stays on screen
+# with the same key, its pixels are put back without recording damage, so
+# it costs no SPI transfer, and it is not redrawn at all unless something
+# erased or drew over part of it; only a new key, or a layer appearing or
+# going away, damages it. Everything else is drawn as before and erased
+# from the spans the LCD damaged last frame, instead of clearing the
+# whole buffer.
+
+_STALE = object()  # Key of a layer that must be redrawn
+
+
+class Layer:
+    # A static box of the screen drawn by render(target, x, y, key). With
+    # cached=True it is rendered into an offscreen buffer once per key and
+    # blitted, `transparent` being the colour key; otherwise it is
+    # rendered straight to the LCD each frame. A cached layer's render
+    # gets the LCD's inks for `colors` (RGB565) after the key, since its
+    # target is the buffer, not the LCD.
+    def __init__(self, x, y, w, h, render, cached=False, transparent=-1, colors=()):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.render = render
+        self.cached = cached
+        self.transparent = transparent
+        self.key = None
+        self.shown_key = _STALE  # Key the panel shows
+        self.fresh = True  # Changed since last frame; set by Scene.begin
+        self.colors = colors
+        self.fb = None
+        self.fb_lcd = None  # The LCD whose format and inks fb holds
+        self.fb_key = _STALE
+        self.scene = None  # Set by Scene.begin
+
+    def set(self, key):
+        self.key = key
+        return self
+
+    def invalidate(self):
+        # Redraw on the next frame even if the key is unchanged
+        self.shown_key = self.fb_key = _STALE
+
+    def overlaps(self, other):
+        return (self.x < other.x + other.w and other.x < self.x + self.w and
+                self.y < other.y + other.h and other.y < self.y + self.h)
+
+    def draw(self, lcd):
+        scene = self.scene
+        if not self.fresh:
+            if not lcd.changed(self.x, self.y, self.w, self.h):
+                # Still intact in the buffer, unless an earlier layer was
+                # put back over it; that leaves no damage to see
+                for layer in scene.redrawn:
+                    if layer.overlaps(self):
+                        break
+                else:
+                    return
+            scene.redrawn.append(self)
+        if self.cached:
+            if self.fb_lcd is not lcd:
+                self.fb = lcd.sprite(self.w, self.h)
+                self.fb_lcd = lcd
+                self.fb_key = _STALE
+            if self.fb_key != self.key:
+                self.render(self.fb, 0, 0, self.key, *[lcd.ink(c) for c in self.colors])
+                self.fb_key = self.key
+        lcd.track = self.fresh
+        if self.cached:
+            lcd.blit(self.fb, self.x, self.y, self.transparent, w=self.w, h=self.h)
+        else:
+            self.render(lcd, self.x, self.y, self.key)
+        lcd.track = True
+
+
+class Scene:
+    def __init__(self):
+        self.shown = []  # Last frame's layers
+        self.redrawn = []  # Unchanged layers put back this frame
+
+    def begin(self, lcd, layers, background=0):
+        # Erase last frame's moving objects and fresh layers, then the
+        # boxes of layers drawn untracked last frame that went away or
+        # changed; the unchanged ones stay in the buffer as they are
+        lcd.clear(background)
+        self.redrawn.clear()
+        shown = self.shown
+        for layer in shown:
+            if layer not in layers:
+                if not layer.fresh:
+                    lcd.fill_rect(layer.x, layer.y, layer.w, layer.h, background)
+                layer.shown_key = _STALE
+        for layer in layers:
+            kept = layer in shown
+            fresh = layer.shown_key != layer.key or not kept
+            if fresh and kept and not layer.fresh:
+                lcd.fill_rect(layer.x, layer.y, layer.w, layer.h, background)
+            layer.fresh = fresh
+            layer.shown_key = layer.key
+            layer.scene = self
+        shown.clear()
+        shown.extend(layers)
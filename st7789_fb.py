@@ -1,7 +1,19 @@
 from machine import Pin, SPI
+from array import array
 import framebuf
+import machine
+import micropython
 import time
 
+try:
+    import rp2
+except ImportError:
+    rp2 = None
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
 BL = 13
 DC = 8
 RST = 12
@@ -9,42 +21,319 @@ MOSI = 11
 SCK = 10
 CS = 9
 
+# Damage tracking: rows are grouped in bands, each band keeps the x span
+# touched by drawing this frame. A window is worth merging with its
+# neighbour if that wastes fewer pixels than WINDOW_COST (the CASET/RASET/
+# RAMWR setup for a separate window).
+BAND_H = 8
+WINDOW_COST = 64
+NO_DAMAGE = 0xFFFF
+
+# Filled circles are drawn as runs of equal-width rows. Runs for radii up
+# to SPAN_CACHE_RADIUS are kept, which covers balls and power-ups.
+SPAN_CACHE_RADIUS = 16
+_disc_runs = {}
+
+# framebuf.ellipse (MicroPython 1.20+) draws circle outlines in C
+HAS_ELLIPSE = hasattr( framebuf.FrameBuffer, "ellipse" )
+
+def disc_runs( r ):
+    """Runs (dy, rows, half width) covering a filled circle of radius r"""
+    runs = _disc_runs.get( r )
+    if runs is not None:
+        return runs
+    # Half width per |dy|, from the same Bresenham walk LCD.circle uses
+    half = array( 'H', [0] * (r + 1) )
+    half[0] = r
+    if r >= 1:
+        half[1] = r
+    f = 1 - r
+    ddf_x = 1
+    ddf_y = -2 * r
+    x = 0
+    y = r
+    while x < y:
+        if f >= 0:
+            y -= 1
+            ddf_y += 2
+            f += ddf_y
+        x += 1
+        ddf_x += 2
+        f += ddf_x
+        if x > half[y]:
+            half[y] = x
+        if y > half[x]:
+            half[x] = y
+    runs = array( 'h' )
+    dy = -r
+    while dy <= r:
+        w = half[dy if dy >= 0 else -dy]
+        rows = 1
+        while dy + rows <= r and half[abs(dy + rows)] == w:
+            rows += 1
+        runs.append( dy )
+        runs.append( rows )
+        runs.append( w )
+        dy += rows
+    if r <= SPAN_CACHE_RADIUS:
+        _disc_runs[r] = runs
+    return runs
+
+def fill_circle( fb, x, y, r, c ):
+    """Filled circle on any FrameBuffer, one fill_rect per run of rows"""
+    fill_rect = framebuf.FrameBuffer.fill_rect
+    runs = disc_runs( r )
+    for i in range( 0, len( runs ), 3 ):
+        w = runs[i + 2]
+        fill_rect( fb, x - w, y + runs[i], 2 * w + 1, runs[i + 1], c )
+
+# Panel geometry by native (width, height): for each rotation the MADCTL
+# value, the resulting width and height, and the x/y offsets of the glass
+# in the controller's 240x320 memory. Rotation 1 of the 135x240 panel is
+# the landscape mode the game uses.
+ROTATIONS = {
+    (135, 240): (
+        (0x00, 135, 240, 52, 40),
+        (0x70, 240, 135, 40, 53),
+        (0xC0, 135, 240, 53, 40),
+        (0xA0, 240, 135, 40, 52)
+    ),
+    (240, 240): (
+        (0x00, 240, 240, 0, 0),
+        (0x60, 240, 240, 0, 0),
+        (0xC0, 240, 240, 0, 80),
+        (0xA0, 240, 240, 80, 0)
+    ),
+    (240, 320): (
+        (0x00, 240, 320, 0, 0),
+        (0x60, 320, 240, 0, 0),
+        (0xC0, 240, 320, 0, 0),
+        (0xA0, 320, 240, 0, 0)
+    )
+}
+CONTROLLER_LINES = 320  # Gate lines scroll and partial mode address
+
+# Frame buffer formats by bits per pixel. Below 16 bits the buffer holds
+# palette indices (see LCD.ink) and show() expands them to RGB565 as it
+# sends, EXPAND_ROWS rows at a time through a small reusable buffer.
+FORMATS = {
+    16: framebuf.RGB565,
+    8: framebuf.GS8,
+    4: framebuf.GS4_HMSB
+}
+EXPAND_ROWS = 8
+
+# SPI clock. The RP2040 divides its peripheral clock by an even number, so
+# this is the fastest it can go at 125 MHz, and the ST7789's 16 ns minimum
+# write cycle allows it; the port rounds other rates down to a divider.
+BAUDRATE = 62_500_000
+
+# Sent after reset and MADCTL, one command and its parameters per entry:
+# 16-bit colour, porch and gate timing, power settings, gamma, then colour
+# inversion on, sleep out and display on
+INIT_SEQUENCE = (
+    (0x3A, b"\x05"),
+    (0xB2, b"\x0C\x0C\x00\x33\x33"),
+    (0xB7, b"\x35"),
+    (0xBB, b"\x19"),
+    (0xC0, b"\x2C"),
+    (0xC2, b"\x01"),
+    (0xC3, b"\x12"),
+    (0xC4, b"\x20"),
+    (0xC6, b"\x0F"),
+    (0xD0, b"\xA4\xA1"),
+    (0xE0, b"\xD0\x04\x0D\x11\x13\x2B\x3F\x54\x4C\x18\x0D\x0B\x1F\x23"),
+    (0xE1, b"\xD0\x04\x0C\x11\x13\x2C\x3F\x44\x51\x2F\x1F\x1F\x20\x23"),
+    (0x21, None),
+    (0x11, None),
+    (0x29, None)
+)
+
+# ST7789 commands beyond the init sequence
+PTLON = 0x12
+NORON = 0x13
+CASET = 0x2A
+RASET = 0x2B
+RAMWR = 0x2C
+PTLAR = 0x30
+VSCRDEF = 0x33
+MADCTL = 0x36
+VSCSAD = 0x37
+IDMOFF = 0x38
+IDMON = 0x39
+
+# RP2040 SPI1 registers, used when frames are pushed by DMA
+SPI1_SSPDR = 0x4004_0008
+SPI1_SSPSR = 0x4004_000C
+SPI1_SSPICR = 0x4004_0020
+SSPSR_RNE = 0x04
+SSPSR_BSY = 0x10
+DREQ_SPI1_TX = 18
+
 class LCD( framebuf.FrameBuffer ):
     def width( self ):
-        return 240
+        return self.w
     def height( self ):
-        return 135
+        return self.h
     def pixel( self, x, y, c=None ):
         if( c is None ):
             return super().pixel( int(x), int(y) )
         else:
-            super().pixel( int(x), int(y), int(c) )
+            x = int(x)
+            y = int(y)
+            self.damage( x, y, x, y )
+            super().pixel( x, y, int(c) )
+    def hline( self, x, y, w, c ):
+        x = int(x)
+        y = int(y)
+        w = int(w)
+        self.damage( x, y, x + w - 1, y )
+        super().hline( x, y, w, int(c) )
+    def vline( self, x, y, h, c ):
+        x = int(x)
+        y = int(y)
+        h = int(h)
+        self.damage( x, y, x, y + h - 1 )
+        super().vline( x, y, h, int(c) )
     def rect( self, x, y, w, h, c ):
-        super().rect( int(x), int(y), int(w), int(h), int(c) )
+        x = int(x)
+        y = int(y)
+        w = int(w)
+        h = int(h)
+        self.damage( x, y, x + w - 1, y + h - 1 )
+        super().rect( x, y, w, h, int(c) )
     def rectangle( self, x, y, w, h, c ):
-        super().rect( int(x), int(y), int(w), int(h), int(c) )
+        self.rect( x, y, w, h, c )
     def fill_rect( self, x, y, w, h, c ):
-        super().fill_rect( int(x), int(y), int(w), int(h), int(c) )
+        x = int(x)
+        y = int(y)
+        w = int(w)
+        h = int(h)
+        self.damage( x, y, x + w - 1, y + h - 1 )
+        super().fill_rect( x, y, w, h, int(c) )
     def fill_rectangle( self, x, y, w, h, c ):
-        super().fill_rect( int(x), int(y), int(w), int(h), int(c) )
+        self.fill_rect( x, y, w, h, c )
     def line( self, x0, y0, x1, y1, c ):
-        super().line( int(x0), int(y0), int(x1), int(y1), int(c) )
+        x0 = int(x0)
+        y0 = int(y0)
+        x1 = int(x1)
+        y1 = int(y1)
+        self.damage( min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1) )
+        super().line( x0, y0, x1, y1, int(c) )
     def text( self, txt, x, y, c ):
-        super().text( txt, int(x), int(y), int(c) )
+        x = int(x)
+        y = int(y)
+        self.damage( x, y, x + 8 * len(txt) - 1, y + 7 )
+        super().text( txt, x, y, int(c) )
+    def blit( self, fbuf, x, y, key=-1, palette=None, w=None, h=None ):
+        # framebuf.FrameBuffer does not expose its size, so callers that
+        # want partial refresh pass it; otherwise everything is refreshed.
+        x = int(x)
+        y = int(y)
+        if w is None or h is None:
+            self.invalidate()
+        else:
+            self.damage( x, y, x + w - 1, y + h - 1 )
+        if palette is None:
+            super().blit( fbuf, x, y, key )
+        else:
+            super().blit( fbuf, x, y, key, palette )
+    def scroll( self, dx, dy ):
+        self.invalidate()
+        super().scroll( int(dx), int(dy) )
+    def fill( self, c ):
+        # Clearing to the same colour as last frame only erases what was
+        # drawn since, and that is already tracked by the previous frame's
+        # damage. A new background colour changes every pixel.
+        c = int(c)
+        if c != self.background:
+            self.background = c
+            self.invalidate()
+        super().fill( c )
+    def clear( self, c ):
+        # fill(), but only over the spans drawn last frame, when the rest
+        # of the buffer is known to hold the background already. Pixels
+        # drawn with track off are not erased; their owner redraws them.
+        c = int(c)
+        self.cleared_all = c != self.background or self.full_refresh or self.dirty
+        if self.cleared_all:
+            self.dirty = False
+            self.fill( c )
+            return
+        lo = self.prev_x0
+        hi = self.prev_x1
+        last_row = self.height() - 1
+        for b in range( len(lo) ):
+            if lo[b] <= hi[b]:
+                y = b * BAND_H
+                h = BAND_H if y + BAND_H <= last_row else last_row - y + 1
+                super().fill_rect( lo[b], y, hi[b] - lo[b] + 1, h, c )
+    def changed( self, x, y, w, h ):
+        # Whether the box may have lost pixels drawn with track off: the
+        # last clear() or this frame's tracked drawing reached into it
+        if self.cleared_all:
+            return True
+        x1 = x + w - 1
+        y1 = y + h - 1
+        if y < 0:
+            y = 0
+        if y1 >= self.height():
+            y1 = self.height() - 1
+        lo, hi = self.prev_x0, self.prev_x1
+        dlo, dhi = self.damage_x0, self.damage_x1
+        for b in range( y // BAND_H, y1 // BAND_H + 1 ):
+            if (lo[b] <= x1 and hi[b] >= x) or (dlo[b] <= x1 and dhi[b] >= x):
+                return True
+        return False
     
-    def __init__(self):
+    def __init__(self, flush="sync", width=135, height=240, rotation=1, rotations=None,
+                 baudrate=BAUDRATE, bits=16, palette=None):
+        # width and height are the panel's native size; rotations replaces
+        # its ROTATIONS entry, for panels not listed there. With bits 8 or 4
+        # the buffer is indexed, palette giving the first colours to add.
+        if rotations is None:
+            rotations = ROTATIONS[(width, height)]
+        self.madctl, self.w, self.h, self.x_offset, self.y_offset = rotations[rotation]
         
         self.cs = Pin(CS,Pin.OUT)
         self.rst = Pin(RST,Pin.OUT)
         
         self.cs(1)
-        self.spi = SPI(1)
-        self.spi = SPI(1,1000_000)
-        self.spi = SPI(1,10000_000,polarity=0, phase=0,sck=Pin(SCK),mosi=Pin(MOSI),miso=None)
+        self.spi = SPI(1,baudrate,polarity=0, phase=0,sck=Pin(SCK),mosi=Pin(MOSI),miso=None)
         self.dc = Pin(DC,Pin.OUT)
         self.dc(1)
-        self.buffer = bytearray(self.height() * self.width() * 2)
-        super().__init__(self.buffer, self.width(), self.height(), framebuf.RGB565)
+        # Command byte and parameters, reused by every transaction
+        self.cmd_buf = bytearray(1)
+        self.param_buf = bytearray(6)
+        self.param_mv = memoryview(self.param_buf)
+        # Window setup, CASET x0 x1 RASET y0 y1 RAMWR, with views of its
+        # command and parameter bytes made once
+        self.window_buf = bytearray((CASET, 0, 0, 0, 0, RASET, 0, 0, 0, 0, RAMWR))
+        mv = memoryview(self.window_buf)
+        self.window_parts = (mv[0:1], mv[1:5], mv[5:6], mv[6:10], mv[10:11])
+        self.bits = bits
+        self.format = FORMATS[bits]
+        self.stride = (self.width() * bits + 7) // 8  # Bytes per buffer row
+        self.buffer = bytearray(self.height() * self.stride)
+        self.buffer_mv = memoryview(self.buffer)
+        super().__init__(self.buffer, self.width(), self.height(), self.format)
+        self.init_palette(palette)
+        
+        bands = (self.height() + BAND_H - 1) // BAND_H
+        self.damage_x0 = array('H', [NO_DAMAGE] * bands)
+        self.damage_x1 = array('H', [0] * bands)
+        self.prev_x0 = array('H', [NO_DAMAGE] * bands)
+        self.prev_x1 = array('H', [0] * bands)
+        self.background = 0
+        self.full_refresh = True
+        self.dirty = True  # The buffer may hold untracked pixels; see clear()
+        self.cleared_all = True  # The last clear() filled the whole buffer
+        self.track = True  # Record damage for drawing; see damage()
+        self.partial = True
+        # Windows queued by show(), four values (x0, y0, x1, y1) each
+        self.regions = array('H', [0] * 4 * (bands + 1))
+        self.region_count = 0
+        self.init_flush(flush)
         self.init_display()
         
         self.red   =   0x07E0
@@ -59,25 +348,63 @@ class LCD( framebuf.FrameBuffer ):
         self.darkgray= 0x4208
         self.lightgray=0xC618
     def circle( self, x, y, r, c ):
-        self.__circle( int(x), int(y), int(r), c, False )
+        x = int(x)
+        y = int(y)
+        r = int(r)
+        self.damage( x - r, y - r, x + r, y + r )
+        if HAS_ELLIPSE:
+            super().ellipse( x, y, r, r, int(c) )
+        else:
+            self.__circle( x, y, r, int(c) )
     def fill_circle( self, x, y, r, c ):
-        self.__circle( int(x), int(y), int(r), c, True )
-        self.line( x - r, y - 1, x + r, y - 1, c )
-        self.line( x - r, y + 1, x + r, y + 1, c )
-        self.line( x - r, y - 0, x + r, y - 0, c )
-    
-    def __circle( self, x, y, r, c, fill ):
+        x = int(x)
+        y = int(y)
+        r = int(r)
+        self.damage( x - r, y - r, x + r, y + r )
+        fill_circle( self, x, y, r, int(c) )
+    def ellipse( self, x, y, xr, yr, c, f=False, m=0x0F ):
+        x = int(x)
+        y = int(y)
+        xr = int(xr)
+        yr = int(yr)
+        self.damage( x - xr, y - yr, x + xr, y + yr )
+        super().ellipse( x, y, xr, yr, int(c), f, m )
+    def poly( self, x, y, coords, c, f=False ):
+        # coords holds x, y pairs relative to (x, y)
+        x = int(x)
+        y = int(y)
+        x0 = x1 = coords[0]
+        y0 = y1 = coords[1]
+        for i in range( 2, len(coords), 2 ):
+            px = coords[i]
+            py = coords[i + 1]
+            if px < x0:
+                x0 = px
+            elif px > x1:
+                x1 = px
+            if py < y0:
+                y0 = py
+            elif py > y1:
+                y1 = py
+        self.damage( x + x0, y + y0, x + x1, y + y1 )
+        super().poly( x, y, coords, int(c), f )
+
+    @micropython.native
+    def __circle( self, x, y, r, c ):
         # Bresenham’s circle drawing algorithm
+        # Callers have already recorded the damage, so this goes straight
+        # to the framebuf primitives.
+        pixel = super().pixel
         x0, y0 = x, y
         f = 1 - r
         ddf_x = 1
         ddf_y = -2 * r
         x = 0
         y = r
-        self.pixel( x0, y0 + r, c )
-        self.pixel( x0, y0 - r, c )
-        self.pixel( x0 + r, y0, c )
-        self.pixel( x0 - r, y0, c )
+        pixel( x0, y0 + r, c )
+        pixel( x0, y0 - r, c )
+        pixel( x0 + r, y0, c )
+        pixel( x0 - r, y0, c )
         while x < y:
             if f >= 0:
                 y -= 1
@@ -86,33 +413,109 @@ class LCD( framebuf.FrameBuffer ):
             x += 1
             ddf_x += 2
             f += ddf_x
-            if fill:
-                self.line( x0 - x, y0 + y, x0 + x, y0 + y, c )
-                self.line( x0 - x, y0 - y, x0 + x, y0 - y, c )
-                self.line( x0 - y, y0 + x, x0 + y, y0 + x, c )
-                self.line( x0 - y, y0 - x, x0 + y, y0 - x, c )
-            else:
-                self.pixel( x0 + x, y0 + y, c )
-                self.pixel( x0 - x, y0 + y, c )
-                self.pixel( x0 + x, y0 - y, c )
-                self.pixel( x0 - x, y0 - y, c )
-                self.pixel( x0 + y, y0 + x, c )
-                self.pixel( x0 - y, y0 + x, c )
-                self.pixel( x0 + y, y0 - x, c )
-                self.pixel( x0 - y, y0 - x, c )
+            pixel( x0 + x, y0 + y, c )
+            pixel( x0 - x, y0 + y, c )
+            pixel( x0 + x, y0 - y, c )
+            pixel( x0 - x, y0 - y, c )
+            pixel( x0 + y, y0 + x, c )
+            pixel( x0 - y, y0 + x, c )
+            pixel( x0 + y, y0 - x, c )
+            pixel( x0 - y, y0 - x, c )
     
-    def write_cmd(self, cmd):
-        self.cs(1)
+    def damage( self, x0, y0, x1, y1 ):
+        # Record an inclusive box as needing transfer on the next show().
+        # With track off, drawing is known to repeat what the panel shows.
+        if not self.track:
+            return
+        if x0 < 0:
+            x0 = 0
+        if y0 < 0:
+            y0 = 0
+        if x1 >= self.width():
+            x1 = self.width() - 1
+        if y1 >= self.height():
+            y1 = self.height() - 1
+        if x0 > x1 or y0 > y1:
+            return
+        lo = self.damage_x0
+        hi = self.damage_x1
+        for b in range( y0 // BAND_H, y1 // BAND_H + 1 ):
+            if x0 < lo[b]:
+                lo[b] = x0
+            if x1 > hi[b]:
+                hi[b] = x1
+    
+    def invalidate( self ):
+        # Send the whole frame on the next show()
+        self.full_refresh = True
+    
+    def sprite( self, w, h ):
+        # Offscreen buffer in the frame buffer's format, for blit(); draw
+        # on it with inks too
+        return framebuf.FrameBuffer( bytearray( (w * self.bits + 7) // 8 * h ), w, h, self.format )
+    
+    def init_palette(self, colors):
+        if self.bits == 16:
+            self.palette = None
+            self.inks = None
+            return
+        size = 1 << self.bits
+        self.palette = framebuf.FrameBuffer(bytearray(size * 2), size, 1, framebuf.RGB565)
+        # RGB565 colour -> index. Black is index 0, so a background or
+        # blit key of 0 means the same in either mode.
+        self.inks = {0: 0}
+        self.ink_count = 1
+        width = self.width()
+        self.expand_buffer = bytearray(width * EXPAND_ROWS * 2)
+        self.expand_mv = memoryview(self.expand_buffer)
+        self.expand_fb = framebuf.FrameBuffer(self.expand_buffer, width, EXPAND_ROWS, framebuf.RGB565)
+        for c in colors or ():
+            self.ink(c)
+    
+    def ink( self, c ):
+        # The value that draws RGB565 colour c: c itself, or with an indexed
+        # buffer its palette index. Drawing methods, fill colours and blit
+        # keys all take inks; look them up once where drawing starts.
+        inks = self.inks
+        if inks is None:
+            return c
+        i = inks.get(c)
+        if i is None:
+            i = self.add_ink(c)
+        return i
+    
+    def add_ink(self, c):
+        # A new colour takes the next free index. Once the palette is full
+        # it gets the nearest entry's instead.
+        if self.ink_count < 1 << self.bits:
+            i = self.ink_count
+            self.ink_count += 1
+            self.palette.pixel(i, 0, c)
+        else:
+            i = 0
+            best = 1 << 30
+            for j in range(self.ink_count):
+                p = self.palette.pixel(j, 0)
+                dr = (c >> 11) - (p >> 11)
+                dg = ((c >> 5) & 0x3F) - ((p >> 5) & 0x3F)
+                db = (c & 0x1F) - (p & 0x1F)
+                d = 4 * (dr * dr + db * db) + dg * dg
+                if d < best:
+                    best = d
+                    i = j
+        self.inks[c] = i
+        return i
+    
+    def write_cmd(self, cmd, data=None):
+        # One transaction: the command byte, then its parameters, if any,
+        # while CS stays low
+        self.cmd_buf[0] = cmd
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
-        self.cs(1)
-
-    def write_data(self, buf):
-        self.cs(1)
-        self.dc(1)
-        self.cs(0)
-        self.spi.write(bytearray([buf]))
+        self.spi.write(self.cmd_buf)
+        if data is not None:
+            self.dc(1)
+            self.spi.write(data)
         self.cs(1)
 
     def init_display(self):
@@ -121,99 +524,350 @@ class LCD( framebuf.FrameBuffer ):
         self.rst(0)
         self.rst(1)
         
-        self.write_cmd(0x36)
-        self.write_data(0x70)
-
-        self.write_cmd(0x3A) 
-        self.write_data(0x05)
-
-        self.write_cmd(0xB2)
-        self.write_data(0x0C)
-        self.write_data(0x0C)
-        self.write_data(0x00)
-        self.write_data(0x33)
-        self.write_data(0x33)
-
-        self.write_cmd(0xB7)
-        self.write_data(0x35) 
-
-        self.write_cmd(0xBB)
-        self.write_data(0x19)
-
-        self.write_cmd(0xC0)
-        self.write_data(0x2C)
-
-        self.write_cmd(0xC2)
-        self.write_data(0x01)
-
-        self.write_cmd(0xC3)
-        self.write_data(0x12)   
-
-        self.write_cmd(0xC4)
-        self.write_data(0x20)
-
-        self.write_cmd(0xC6)
-        self.write_data(0x0F) 
-
-        self.write_cmd(0xD0)
-        self.write_data(0xA4)
-        self.write_data(0xA1)
-
-        self.write_cmd(0xE0)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0D)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2B)
-        self.write_data(0x3F)
-        self.write_data(0x54)
-        self.write_data(0x4C)
-        self.write_data(0x18)
-        self.write_data(0x0D)
-        self.write_data(0x0B)
-        self.write_data(0x1F)
-        self.write_data(0x23)
-
-        self.write_cmd(0xE1)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0C)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2C)
-        self.write_data(0x3F)
-        self.write_data(0x44)
-        self.write_data(0x51)
-        self.write_data(0x2F)
-        self.write_data(0x1F)
-        self.write_data(0x1F)
-        self.write_data(0x20)
-        self.write_data(0x23)
+        self.param_buf[0] = self.madctl
+        self.write_cmd(MADCTL, self.param_mv[:1])
+        for cmd, data in INIT_SEQUENCE:
+            self.write_cmd(cmd, data)
+
+    def set_window(self, x0, y0, x1, y1):
+        # CASET, RASET and RAMWR in one transaction, DC toggling between
+        # command and parameter bytes. CS is left low and DC high for the
+        # pixel data that follows; the caller raises CS when it is sent.
+        x0 += self.x_offset
+        x1 += self.x_offset
+        y0 += self.y_offset
+        y1 += self.y_offset
+        
+        w = self.window_buf
+        w[1] = x0 >> 8
+        w[2] = x0 & 0xFF
+        w[3] = x1 >> 8
+        w[4] = x1 & 0xFF
+        w[6] = y0 >> 8
+        w[7] = y0 & 0xFF
+        w[8] = y1 >> 8
+        w[9] = y1 & 0xFF
         
-        self.write_cmd(0x21)
+        caset, columns, raset, rows, ramwr = self.window_parts
+        write = self.spi.write
+        dc = self.dc
+        dc(0)
+        self.cs(0)
+        write(caset)
+        dc(1)
+        write(columns)
+        dc(0)
+        write(raset)
+        dc(1)
+        write(rows)
+        dc(0)
+        write(ramwr)
+        dc(1)
+
+    # The commands below wait for any background flush first, since they
+    # share the bus with it. Scrolling and partial mode address the
+    # controller's gate lines (0..CONTROLLER_LINES - 1), not frame rows:
+    # with the row/column exchange of a landscape MADCTL they run along
+    # the screen's x axis, offset by x_offset.
 
-        self.write_cmd(0x11)
+    def write_words(self, cmd, *words):
+        # A command with up to three 16-bit big-endian parameters
+        p = self.param_buf
+        i = 0
+        for word in words:
+            p[i] = word >> 8
+            p[i + 1] = word & 0xFF
+            i += 2
+        self.write_cmd(cmd, self.param_mv[:i])
 
-        self.write_cmd(0x29)
+    def scroll_area(self, top, height, bottom=None):
+        """Define the vertical scroll area (VSCRDEF): fixed top lines,
+        scrolling lines and fixed bottom lines, which must add up to
+        CONTROLLER_LINES; bottom defaults to the rest."""
+        if bottom is None:
+            bottom = CONTROLLER_LINES - top - height
+        if top < 0 or height < 0 or bottom < 0 or top + height + bottom != CONTROLLER_LINES:
+            raise ValueError("scroll area must cover %d lines" % CONTROLLER_LINES)
+        self.wait_flush()
+        self.write_words(VSCRDEF, top, height, bottom)
+
+    def scroll_start(self, line):
+        """Show the scroll area from this line (VSCSAD): a hardware
+        scroll that costs one command, the frame buffer is untouched."""
+        self.wait_flush()
+        self.write_words(VSCSAD, line)
+
+    def partial_mode(self, start, end):
+        """Enter partial mode (PTLAR, PTLON): only lines start..end are
+        driven and the rest are left blank, saving power."""
+        self.wait_flush()
+        self.write_words(PTLAR, start, end)
+        self.write_cmd(PTLON)
+
+    def normal_mode(self):
+        """Leave partial mode (NORON)"""
+        self.wait_flush()
+        self.write_cmd(NORON)
+
+    def idle_mode(self, on=True):
+        """Idle mode (IDMON/IDMOFF): 8 colours, one bit per channel,
+        for lower power on screens that need no more."""
+        self.wait_flush()
+        self.write_cmd(IDMON if on else IDMOFF)
+
+    def write_window(self, x, y, w, h, buf):
+        """Send w x h RGB565 pixels straight to that box of the panel.
+        The frame buffer is not changed, so the box stays until the
+        next show() that damages it, or invalidate()."""
+        self.wait_flush()
+        self.set_window(x, y, x + w - 1, y + h - 1)
+        self.spi.write(buf)
+        self.cs(1)
+
+    def throughput(self, frames=10):
+        """Send the whole buffer frames times and return the rate achieved,
+        in bytes per second with the window setup included. At best this
+        is the SPI baudrate / 8; the port may have rounded the baudrate
+        down, and the CPU's gaps between writes show up here too."""
+        self.wait_flush()
+        start = time.ticks_us()
+        for _ in range(frames):
+            self.write_region(0, 0, self.width() - 1, self.height() - 1)
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        return self.width() * self.height() * 2 * frames * 1_000_000 // max(elapsed, 1)
+
+    def init_flush(self, mode):
+        """Pick how show() hands frames to the panel.
+
+        "sync" sends from the draw buffer before returning. "dma" and
+        "thread" copy the damaged regions into a second buffer and send
+        it in the background (RP2040 DMA or a thread on the other core),
+        so the next frame can be simulated and drawn meanwhile. "auto"
+        picks the best one the port supports. DMA needs an RGB565 buffer
+        to send from, so indexed buffers use the thread instead.
+        """
+        if mode == "auto":
+            if rp2 is not None and hasattr(rp2, "DMA") and self.palette is None:
+                mode = "dma"
+            elif _thread is not None:
+                mode = "thread"
+            else:
+                mode = "sync"
+        self.flush_mode = mode
+        self.flushing = False
+        # write_regions() sends from tx_src: a memoryview of RGB565 bytes,
+        # or a FrameBuffer of indices to expand
+        if mode == "sync":
+            self.tx_buffer = None
+            self.tx_mv = self.buffer_mv
+            self.tx_src = self.buffer_mv if self.palette is None else self
+            return
+        self.tx_buffer = bytearray(len(self.buffer))
+        self.tx_mv = memoryview(self.tx_buffer)
+        if self.palette is None:
+            self.tx_src = self.tx_mv
+        else:
+            self.tx_src = framebuf.FrameBuffer(self.tx_buffer, self.width(), self.height(), self.format)
+        if mode == "dma":
+            if self.palette is not None:
+                raise ValueError("dma flush needs an RGB565 buffer")
+            self.dma = rp2.DMA()
+            self.dma_ctrl = self.dma.pack_ctrl(size=0, inc_write=False, treq_sel=DREQ_SPI1_TX)
+        elif mode == "thread":
+            self.flush_go = _thread.allocate_lock()
+            self.flush_done = _thread.allocate_lock()
+            self.flush_go.acquire()
+            _thread.start_new_thread(self.flush_worker, ())
+        else:
+            raise ValueError("unknown flush mode: %s" % mode)
+
+    def flush_worker(self):
+        while True:
+            self.flush_go.acquire()
+            self.write_regions(self.tx_src)
+            self.flush_done.release()
+
+    def wait_flush(self):
+        """Block until the frame handed to the panel has been sent.
+
+        show() does this itself; call it before sending other commands
+        or exiting while a background flush may still be running.
+        """
+        if not self.flushing:
+            return
+        if self.flush_mode == "dma":
+            while self.dma.active():
+                pass
+            while machine.mem32[SPI1_SSPSR] & SSPSR_BSY:
+                pass
+            # The SPI clocked in junk while DMA clocked out; drop it
+            while machine.mem32[SPI1_SSPSR] & SSPSR_RNE:
+                machine.mem32[SPI1_SSPDR]
+            machine.mem32[SPI1_SSPICR] = 0x01
+            self.cs(1)
+        else:
+            self.flush_done.acquire()
+            self.flush_done.release()
+        self.flushing = False
+
+    def add_region(self, x0, y0, x1, y1):
+        r = self.regions
+        i = self.region_count * 4
+        r[i] = x0
+        r[i + 1] = y0
+        r[i + 2] = x1
+        r[i + 3] = y1
+        self.region_count += 1
+
+    def write_regions(self, src):
+        r = self.regions
+        for i in range(0, self.region_count * 4, 4):
+            self.write_region(r[i], r[i + 1], r[i + 2], r[i + 3], src)
+
+    def write_region(self, x0, y0, x1, y1, src=None):
+        """Send the inclusive box (x0, y0)-(x1, y1) of the buffer"""
+        if self.palette is not None:
+            self.write_expanded(x0, y0, x1, y1, self if src is None else src)
+            return
+        if src is None:
+            src = self.buffer_mv
+        self.set_window(x0, y0, x1, y1)
+        
+        stride = self.stride
+        start = y0 * stride + x0 * 2
+        if x0 == 0 and x1 == self.width() - 1:
+            self.spi.write(src[start:(y1 + 1) * stride])
+        else:
+            end = start + (x1 - x0 + 1) * 2
+            for _ in range(y1 - y0 + 1):
+                self.spi.write(src[start:end])
+                start += stride
+                end += stride
+        self.cs(1)
+
+    def write_expanded(self, x0, y0, x1, y1, src):
+        # Blitting the index buffer through the palette expands a band of
+        # rows to RGB565 in C; the band is sent while CS stays low
+        self.set_window(x0, y0, x1, y1)
+        
+        fb = self.expand_fb
+        mv = self.expand_mv
+        palette = self.palette
+        row = self.width() * 2
+        n = (x1 - x0 + 1) * 2
+        y = y0
+        while y <= y1:
+            rows = y1 - y + 1
+            if rows > EXPAND_ROWS:
+                rows = EXPAND_ROWS
+            fb.blit(src, -x0, -y, -1, palette)
+            if n == row:
+                self.spi.write(mv[:rows * row])
+            else:
+                start = 0
+                for _ in range(rows):
+                    self.spi.write(mv[start:start + n])
+                    start += row
+            y += rows
+        self.cs(1)
 
     def show(self):
-        self.write_cmd(0x2A)
-        self.write_data(0x00)
-        self.write_data(0x28)
-        self.write_data(0x01)
-        self.write_data(0x17)
+        self.wait_flush()
+        
+        self.region_count = 0
+        if self.full_refresh or not self.partial:
+            if self.full_refresh:
+                self.dirty = True  # Whatever was invalidated is not in the spans
+            self.full_refresh = False
+            self.add_region(0, 0, self.width() - 1, self.height() - 1)
+        else:
+            self.collect_damage()
         
-        self.write_cmd(0x2B)
-        self.write_data(0x00)
-        self.write_data(0x35)
-        self.write_data(0x00)
-        self.write_data(0xBB)
+        # This frame's boxes become next frame's erase list
+        lo, hi = self.prev_x0, self.prev_x1
+        self.prev_x0, self.prev_x1 = self.damage_x0, self.damage_x1
+        self.damage_x0, self.damage_x1 = lo, hi
+        for b in range(len(lo)):
+            lo[b] = NO_DAMAGE
+            hi[b] = 0
         
-        self.write_cmd(0x2C)
+        if self.region_count == 0:
+            return
+        if self.flush_mode == "sync":
+            self.write_regions(self.tx_src)
+        elif self.flush_mode == "dma":
+            self.start_dma()
+        else:
+            self.copy_regions()
+            self.flushing = True
+            self.flush_done.acquire()
+            self.flush_go.release()
+
+    def copy_regions(self):
+        # Only the rows about to be sent need to be current in tx_buffer
+        r = self.regions
+        stride = self.stride
+        bits = self.bits
+        for i in range(0, self.region_count * 4, 4):
+            row = r[i + 1] * stride
+            start = row + r[i] * bits // 8
+            end = row + ((r[i + 2] + 1) * bits + 7) // 8
+            for _ in range(r[i + 3] - r[i + 1] + 1):
+                self.tx_mv[start:end] = self.buffer_mv[start:end]
+                start += stride
+                end += stride
+
+    def start_dma(self):
+        # One DMA transfer needs contiguous memory, so the queued windows
+        # collapse into a single full-width band of rows.
+        r = self.regions
+        y0 = r[1]
+        y1 = r[3]
+        for i in range(4, self.region_count * 4, 4):
+            if r[i + 1] < y0:
+                y0 = r[i + 1]
+            if r[i + 3] > y1:
+                y1 = r[i + 3]
+        stride = self.stride
+        start = y0 * stride
+        end = (y1 + 1) * stride
+        self.tx_mv[start:end] = self.buffer_mv[start:end]
         
-        self.cs(1)
-        self.dc(1)
-        self.cs(0)
-        self.spi.write(self.buffer)
-        self.cs(1)
+        self.set_window(0, y0, self.width() - 1, y1)
+        self.flushing = True
+        self.dma.config(read=self.tx_mv[start:end], write=SPI1_SSPDR,
+                        count=end - start, ctrl=self.dma_ctrl, trigger=True)
+
+    def collect_damage(self):
+        # Union this frame's and last frame's spans per band, then walk the
+        # bands merging neighbours into as few windows as is worthwhile.
+        lo, hi = self.damage_x0, self.damage_x1
+        plo, phi = self.prev_x0, self.prev_x1
+        last_row = self.height() - 1
+        run = False
+        rx0 = rx1 = ry0 = ry1 = 0
+        for b in range(len(lo)):
+            x0 = lo[b] if lo[b] < plo[b] else plo[b]
+            x1 = hi[b] if hi[b] > phi[b] else phi[b]
+            if x0 > x1:
+                if run:
+                    self.add_region(rx0, ry0, rx1, ry1)
+                    run = False
+                continue
+            y0 = b * BAND_H
+            y1 = y0 + BAND_H - 1
+            if y1 > last_row:
+                y1 = last_row
+            if run:
+                ux0 = rx0 if rx0 < x0 else x0
+                ux1 = rx1 if rx1 > x1 else x1
+                merged = (ux1 - ux0 + 1) * (y1 - ry0 + 1)
+                apart = (rx1 - rx0 + 1) * (ry1 - ry0 + 1) + (x1 - x0 + 1) * (y1 - y0 + 1)
+                if merged <= apart + WINDOW_COST:
+                    rx0, rx1, ry1 = ux0, ux1, y1
+                    continue
+                self.add_region(rx0, ry0, rx1, ry1)
+            run = True
+            rx0, rx1, ry0, ry1 = x0, x1, y0, y1
+        if run:
+            self.add_region(rx0, ry0, rx1, ry1)
@@ -0,0 +1,171 @@
+import machine
+import math
+import micropython
+from array import array
+
+try:
+    import rp2
+    import uctypes
+except ImportError:
+    rp2 = None
+
+WAVE_SQUARE = const(0)
+WAVE_SAW = const(1)
+WAVE_SINE = const(2)
+WAVE_NOISE = const(3)
+
+# 8-bit samples at SAMPLE_RATE, rendered BLOCK at a time (8 ms). Phase is
+# a 24-bit accumulator whose top 8 bits index a 256-entry table.
+SAMPLE_RATE = const(16000)
+BLOCK = const(128)
+PHASE_MASK = const(0xFFFFFF)
+NOISE_RATE = const(16)  # The LFSR is clocked at this multiple of the note
+
+def _table(f):
+    t = bytearray(256)
+    for i in range(256):
+        t[i] = f(i)
+    return t
+
+# One cycle of each waveform, 0..255 around 128. Noise has no table; its
+# slot is only a placeholder for the mixer's table argument.
+TABLES = (
+    _table(lambda i: 255 if i < 128 else 0),
+    _table(lambda i: i),
+    _table(lambda i: 128 + int(127 * math.sin(2 * math.pi * i / 256))),
+    bytearray(256)
+)
+
+def increment(freq, wave):
+    # Phase step per sample for a note
+    if wave == WAVE_NOISE:
+        freq *= NOISE_RATE
+    return int(freq * (1 << 24) // SAMPLE_RATE) & PHASE_MASK
+
+def oscillator():
+    # Per-voice state: phase, LFSR
+    return array('i', [0, 0xACE1])
+
+@micropython.viper
+def _mix(acc: ptr32, n: int, table: ptr8, state: ptr32, inc: int, level: int, noise: int):
+    # Add one voice to acc as 128 + sample deviation scaled by level/256,
+    # keeping every stored value non-negative
+    phase = int(state[0])
+    lfsr = int(state[1])
+    i = 0
+    while i < n:
+        if noise:
+            phase += inc
+            if phase > PHASE_MASK:
+                phase &= PHASE_MASK
+                if lfsr & 1:
+                    lfsr = (lfsr >> 1) ^ 0xB400
+                else:
+                    lfsr = lfsr >> 1
+            s = lfsr & 0xFF
+        else:
+            s = int(table[phase >> 16])
+            phase = (phase + inc) & PHASE_MASK
+        acc[i] = int(acc[i]) + 128 + (((s - 128) * level) >> 8)
+        i += 1
+    state[0] = phase
+    state[1] = lfsr
+
+@micropython.viper
+def _output(out: ptr32, acc: ptr32, n: int, bias: int, shift: int):
+    # Remove the per-voice bias, clip to 8 bits and clear acc for the next block
+    i = 0
+    while i < n:
+        v = int(acc[i]) - bias
+        if v < 0:
+            v = 0
+        elif v > 255:
+            v = 255
+        out[i] = v << shift
+        acc[i] = 0
+        i += 1
+
+class Synth:
+    # Mixes sounding voices into blocks of 32-bit words holding 8-bit
+    # samples, shifted into place for the PWM compare register. Voices
+    # need .preset (with .wave, .inc and .noise), .osc and .duty (the
+    # envelope level as duty_u16).
+    def __init__(self, shift=0):
+        self.acc = array('I', [0] * BLOCK)
+        self.shift = shift
+
+    def render(self, voices, out):
+        acc = self.acc
+        k = 0
+        for voice in voices:
+            if voice.duty:
+                preset = voice.preset
+                _mix(acc, BLOCK, TABLES[preset.wave], voice.osc, preset.inc, voice.duty >> 8, preset.noise)
+                k += 1
+        _output(out, acc, BLOCK, 128 * (k - 1), self.shift)
+
+PWM_BASE = const(0x40050000)
+DMA_TIMER0 = const(0x50000420)
+DREQ_DMA_TIMER0 = const(0x3B)
+RING_BITS = const(10)  # Two blocks of 32-bit words: 1024 bytes
+
+def pacing(sys_hz, rate):
+    # X/Y fraction for a DMA pacing timer: rate = sys_hz * X / Y
+    a, b = rate, sys_hz
+    while b:
+        a, b = b, a % b
+    x = rate // a
+    y = sys_hz // a
+    while y > 0xFFFF:
+        x = (x + 1) // 2
+        y = (y + 1) // 2
+    return x, y
+
+class DMAOutput:
+    # Streams synth blocks to a PWM pin. One DMA channel loops forever over
+    # a 2-block ring (hardware address wrapping), paced at SAMPLE_RATE by
+    # DMA timer 0, writing each sample to the pin's compare register with
+    # an 8-bit period. poll() refills the block the DMA has just left, so
+    # a late refill repeats old samples rather than reading stray memory.
+    def __init__(self, pin, voices):
+        machine.PWM(machine.Pin(pin))  # Route the pin and enable its slice
+        slice_base = PWM_BASE + ((pin >> 1) & 7) * 0x14
+        machine.mem32[slice_base + 0x04] = 1 << 4  # DIV = 1
+        machine.mem32[slice_base + 0x10] = 255  # TOP
+        self.synth = Synth(16 if pin & 1 else 0)
+        self.voices = voices
+
+        ring = 1 << RING_BITS
+        self.raw = bytearray(2 * ring)
+        addr = uctypes.addressof(self.raw)
+        offset = -addr & (ring - 1)
+        self.base = addr + offset
+        view = memoryview(self.raw)
+        self.halves = (view[offset:offset + ring // 2], view[offset + ring // 2:offset + ring])
+        self.synth.render(voices, self.halves[0])
+        self.synth.render(voices, self.halves[1])
+        self.playing = 0
+
+        x, y = pacing(machine.freq(), SAMPLE_RATE)
+        machine.mem32[DMA_TIMER0] = (x << 16) | y
+        self.dma = rp2.DMA()
+        self.ctrl = self.dma.pack_ctrl(size=2, inc_read=True, inc_write=False, ring_size=RING_BITS,
+                                       ring_sel=False, treq_sel=DREQ_DMA_TIMER0)
+        self.write = slice_base + 0x0C
+        self.start()
+
+    def start(self):
+        # 2^31 - 1 samples is over a day and a half of sound
+        self.dma.config(read=self.base, write=self.write, count=0x7FFFFFFF, ctrl=self.ctrl, trigger=True)
+
+    def poll(self):
+        if not self.dma.active():
+            self.start()
+        half = 1 if self.dma.read - self.base >= BLOCK * 4 else 0
+        if half != self.playing:
+            self.synth.render(self.voices, self.halves[self.playing])
+            self.playing = half
+
+    def stop(self):
+        self.dma.active(0)
+        self.dma.close()